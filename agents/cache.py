@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from agents.executor import run_blocking
+
+DEFAULT_TTL = float(os.getenv("CACHE_TTL_SECONDS", 24 * 3600))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", 1024))
+DEFAULT_DISK_MAX_BYTES = int(float(os.getenv("CACHE_DISK_MAX_MB", 256)) * 1024 * 1024)
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+
+# Every cache registers itself here so the server can report hit rates
+CACHES = {}
+
+
+def digest_bytes(data) -> str:
+    """Content address of an upload (sha256 hex)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(*parts) -> str:
+    """Combines a content digest with model / prompt versions into a cache key"""
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier JSON result cache: LRU+TTL in memory, bounded directory on disk"""
+
+    def __init__(self, name: str, max_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 ttl: float = DEFAULT_TTL, disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+                 disk_dir: str = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_bytes = disk_max_bytes
+        if disk_dir is None and CACHE_DIR:
+            disk_dir = os.path.join(CACHE_DIR, name)
+        self.disk_dir = disk_dir if disk_max_bytes > 0 else None
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+        CACHES[name] = self
+
+    # --- Public API ---
+    def get(self, key: str):
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        return self._load(key, now)
+
+    def set(self, key: str, value):
+        now = time.time()
+        self._remember(key, value, now)
+        self._disk_set(key, value, now)
+
+    async def get_async(self, key: str):
+        """get() for the event loop: memory hits return inline, disk reads run on the cache pool"""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        if not self.disk_dir:
+            return self._load(key, now) # No I/O, only counts the miss
+        return await run_blocking("cache", self._load, key, now)
+
+    async def set_async(self, key: str, value):
+        """set() for the event loop: the disk write (and any eviction walk) runs on the cache pool"""
+        now = time.time()
+        self._remember(key, value, now)
+        if self.disk_dir:
+            await run_blocking("cache", self._disk_set, key, value, now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hits": hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes
+            }
+
+    # --- Memory tier ---
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            return None
+
+    def _load(self, key, now):
+        """Disk tier lookup after a memory miss; promotes hits into memory"""
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._memory_set(key, value, now)
+        return value
+
+    def _remember(self, key, value, now):
+        with self._lock:
+            self.counters["sets"] += 1
+            self._memory_set(key, value, now)
+
+    def _memory_set(self, key, value, now):
+        self._memory[key] = (now + self.ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    # --- Disk tier ---
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_files(self):
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for filename in names:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) <= now:
+            self._disk_remove(path)
+            return None
+        try:
+            os.utime(path) # mtime doubles as the disk tier's LRU clock
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def _disk_set(self, key, value, now):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = json.dumps({"expires_at": now + self.ttl, "value": value})
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Cache write failed ({self.name}): {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(payload) - old_size
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _disk_remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+
+    def _evict_disk(self):
+        """Drops least recently used files until the tier is back under 90% of its budget"""
+        target = self.disk_max_bytes * 0.9
+        for _, _, path in sorted(self._disk_files()):
+            with self._lock:
+                if self._disk_bytes <= target:
+                    return
+                self.counters["evictions"] += 1
+            self._disk_remove(path)
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in CACHES.items()}
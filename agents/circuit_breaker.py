@@ -0,0 +1,136 @@
+import os
+import time
+import threading
+from agents.metrics import ERRORS
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RECOVERY_SECONDS = float(os.getenv("BREAKER_RECOVERY_SECONDS", 30))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2} # Numeric form for metrics
+
+BREAKERS = {}
+_registry_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; open -> half-open
+    after `recovery_seconds`. In half-open state one trial call is let through:
+    success closes the breaker, failure opens it again.
+
+    While open, calls fail immediately with CircuitOpenError, so callers can
+    serve a cached or empty fallback instead of waiting out a provider timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 recovery_seconds: float = BREAKER_RECOVERY_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._trial_in_flight):
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            if state == HALF_OPEN:
+                self._trial_in_flight = True
+            self.counters["calls"] += 1
+
+    def _release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        ERRORS.inc(self.name)
+        with self._lock:
+            self.counters["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.counters["opened"] += 1
+                    print(f"🔌 Circuit '{self.name}' opened after {self._failures} failures")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def call(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self._release_trial() # Cancelled: neither a success nor a provider failure
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, fn, *args, **kwargs):
+        """Same as call() for a coroutine function (e.g. run_blocking)"""
+        self.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self._release_trial() # Cancelled: neither a success nor a provider failure
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "state_value": STATE_VALUES[state],
+                "consecutive_failures": self._failures,
+                **self.counters
+            }
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Returns the process-wide breaker for a call type, creating it on first use"""
+    with _registry_lock:
+        breaker = BREAKERS.get(name)
+        if breaker is None:
+            breaker = BREAKERS[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in BREAKERS.items()}
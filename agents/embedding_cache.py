@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("cache", "embeddings.sqlite3"))
+EMBEDDING_CACHE_ENTRIES = int(os.getenv("EMBEDDING_CACHE_ENTRIES", 4096))
+
+
+def normalize_text(text: str) -> str:
+    """Queries like 'Streetwear  T-Shirt' and 'streetwear t-shirt' share one embedding"""
+    return " ".join(str(text).lower().split())
+
+
+class EmbeddingCache:
+    """Embeddings keyed on (model, task_type, normalized text): LRU in memory, float32 blobs in SQLite"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+
+        if path:
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Shared by the server and the seeding scripts, so allow concurrent readers
+                self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        model TEXT NOT NULL,
+                        task_type TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        dim INTEGER NOT NULL,
+                        vector BLOB NOT NULL,
+                        PRIMARY KEY (model, task_type, text)
+                    )
+                """)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Embedding cache disabled on disk: {e}")
+                self._conn = None
+
+    def get(self, model: str, task_type: str, text: str):
+        key = (model, task_type, normalize_text(text))
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return vector
+
+            row = None
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT vector FROM embeddings WHERE model = ? AND task_type = ? AND text = ?", key
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Embedding cache read failed: {e}")
+
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+
+            vector = array("f")
+            vector.frombytes(row[0])
+            vector = vector.tolist()
+            self.counters["disk_hits"] += 1
+            self._remember(key, vector)
+            return vector
+
+    def set(self, model: str, task_type: str, text: str, vector):
+        key = (model, task_type, normalize_text(text))
+        vector = list(vector)
+        with self._lock:
+            self.counters["sets"] += 1
+            self._remember(key, vector)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)",
+                    key + (len(vector), array("f", vector).tobytes())
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Embedding cache write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hits": hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
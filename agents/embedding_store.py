@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+
+STORE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+SEARCH_CHUNK_ROWS = 512 # Rows converted at a time while scanning (keeps the buffer cache-sized)
+# By default float16/int8 codes are scored straight from the shared mapping, converting
+# chunk by chunk. Opt in with a budget to convert once and keep a float32 copy that fits
+# it: search then runs at float32 speed, but the copy is private to each worker.
+DENSE_CACHE_BYTES = int(float(os.getenv("EMBEDDING_STORE_CACHE_MB", 0)) * 1024 * 1024)
+
+
+def quantize(unit_vectors, dtype: str):
+    """Returns (codes, scales). int8 uses symmetric per-vector scaling: v ~= code * scale"""
+    if dtype == "int8":
+        scales = np.abs(unit_vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(unit_vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return unit_vectors.astype(STORE_DTYPES[dtype]), np.ones(len(unit_vectors), dtype=np.float32)
+
+
+class EmbeddingStore:
+    """Read-only, memory-mapped vector store (float32, float16 or int8 codes + per-vector norms).
+
+    Layout of a store directory:
+        CURRENT            name of the live version directory
+        v<ts>/header.json  dimension, count, dtype
+        v<ts>/vectors.bin  count x dimension codes
+        v<ts>/scales.f32   per-vector dequantization scale (1.0 unless int8)
+        v<ts>/norms.f32    norm of each dequantized vector, so cosine stays exact on the codes
+        v<ts>/ids.json     ids and metadata
+
+    Writers build a new version and swap CURRENT atomically, so several uvicorn
+    workers can keep the old pages mapped while a new version is published.
+    """
+
+    def __init__(self, path: str, version_dir: str, header: dict, ids, metadata):
+        self.path = path
+        self.version_dir = version_dir
+        self.dimension = header["dimension"]
+        self.count = header["count"]
+        self.dtype = header["dtype"]
+        self.ids = ids
+        self.metadata = metadata
+        self.vectors = self._map("vectors.bin", STORE_DTYPES[self.dtype], (self.count, self.dimension))
+        self.scales = self._map("scales.f32", np.float32, (self.count,))
+        self.norms = self._map("norms.f32", np.float32, (self.count,))
+        self.dense_cache_bytes = DENSE_CACHE_BYTES
+        self._dense = None
+
+    def _map(self, name, dtype, shape):
+        if self.count == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.version_dir, name), dtype=dtype, mode="r", shape=shape)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "CURRENT"))
+
+    @classmethod
+    def open(cls, path: str):
+        with open(os.path.join(path, "CURRENT"), "r", encoding="utf-8") as f:
+            version_dir = os.path.join(path, f.read().strip())
+        with open(os.path.join(version_dir, "header.json"), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        with open(os.path.join(version_dir, "ids.json"), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        return cls(path, version_dir, header, records["ids"], records["metadata"])
+
+    @classmethod
+    def write(cls, path: str, ids, vectors, metadata, dtype: str = "float32", keep_versions: int = 2):
+        """Writes a new version of the store and makes it current"""
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"Unsupported store dtype: {dtype}")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(len(ids), -1) # An empty (0, dimension) matrix is already 2-D
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        codes, scales = quantize(vectors / norms, dtype)
+        dequantized_norms = np.linalg.norm(codes.astype(np.float32) * scales[:, None], axis=1)
+        dequantized_norms[dequantized_norms == 0] = 1.0
+
+        os.makedirs(path, exist_ok=True)
+        version = f"v{time.time_ns()}"
+        version_dir = os.path.join(path, version)
+        os.makedirs(version_dir)
+        codes.tofile(os.path.join(version_dir, "vectors.bin"))
+        scales.tofile(os.path.join(version_dir, "scales.f32"))
+        dequantized_norms.astype(np.float32).tofile(os.path.join(version_dir, "norms.f32"))
+        with open(os.path.join(version_dir, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": list(ids), "metadata": list(metadata)}, f)
+        with open(os.path.join(version_dir, "header.json"), "w", encoding="utf-8") as f:
+            json.dump({"dimension": vectors.shape[1], "count": len(ids), "dtype": dtype}, f)
+
+        tmp_pointer = os.path.join(path, f"CURRENT.{os.getpid()}.tmp")
+        with open(tmp_pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_pointer, os.path.join(path, "CURRENT"))
+
+        # Old versions may still be mapped by other workers; keep the most recent few
+        versions = sorted(d for d in os.listdir(path) if d.startswith("v") and d != version)
+        for old in versions[:max(0, len(versions) - (keep_versions - 1))]:
+            shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+        return cls.open(path)
+
+    def dequantize(self, rows):
+        return self.vectors[rows].astype(np.float32) * self.scales[rows, None]
+
+    def _float32_codes(self):
+        """The codes as a float32 matrix (the mapping itself for float32 stores), or None
+        when a converted copy is disabled or would exceed dense_cache_bytes"""
+        if self.dtype == "float32":
+            return self.vectors
+        if self._dense is None and self.count * self.dimension * 4 <= self.dense_cache_bytes:
+            self._dense = np.asarray(self.vectors, dtype=np.float32)
+        return self._dense
+
+    def search(self, vector, top_k: int = 5, exclude_rows=None):
+        """Cosine top-k computed directly on the stored codes. Returns (rows, scores)"""
+        if self.count == 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        q = np.asarray(vector, dtype=np.float32)
+        q_norm = np.linalg.norm(q)
+        if q_norm == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        q = q / q_norm
+
+        best_rows, best_scores = [], []
+        dense = self._float32_codes()
+        # A float32 matrix is scored in one matmul; otherwise convert a chunk at a time
+        chunk_rows = self.count if dense is not None else SEARCH_CHUNK_ROWS
+        buffer = np.empty((min(chunk_rows, self.count), self.dimension), dtype=np.float32) if dense is None else None
+        for start in range(0, self.count, chunk_rows):
+            end = min(start + chunk_rows, self.count)
+            if dense is None:
+                block = buffer[:end - start]
+                np.copyto(block, self.vectors[start:end], casting="unsafe")
+            else:
+                block = dense[start:end]
+            scores = (block @ q) * self.scales[start:end] / self.norms[start:end]
+            if exclude_rows is not None:
+                excluded = [r - start for r in exclude_rows if start <= r < end]
+                scores[excluded] = -np.inf
+            k = min(top_k, end - start)
+            rows = np.argpartition(-scores, k - 1)[:k]
+            best_rows.append(rows + start)
+            best_scores.append(scores[rows])
+
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        keep = np.isfinite(scores[order])
+        return rows[order][keep], scores[order][keep]
+
+    def size_bytes(self) -> int:
+        return sum(
+            os.path.getsize(os.path.join(self.version_dir, name))
+            for name in os.listdir(self.version_dir)
+        )
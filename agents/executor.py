@@ -0,0 +1,60 @@
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# The Gemini, Pinecone and Groq SDKs are synchronous. Each provider gets its own
+# bounded thread pool so a slow provider cannot starve the others and the
+# event loop stays free to accept new uploads.
+DEFAULT_WORKERS = {
+    "gemini": 16,
+    "pinecone": 16,
+    "groq": 16,
+    "local": 4, # Exact local vector search; NumPy releases the GIL, so size it to the cores
+}
+
+_executors = {}
+
+
+def _max_workers(provider: str) -> int:
+    env_value = os.getenv(f"{provider.upper()}_MAX_WORKERS")
+    if env_value:
+        return max(1, int(env_value))
+    return DEFAULT_WORKERS.get(provider, 8)
+
+
+def get_executor(provider: str) -> ThreadPoolExecutor:
+    """Returns the (lazily created) thread pool for a provider"""
+    executor = _executors.get(provider)
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=_max_workers(provider),
+            thread_name_prefix=f"{provider}-io"
+        )
+        _executors[provider] = executor
+    return executor
+
+
+async def run_blocking(provider: str, fn, *args, **kwargs):
+    """Runs a blocking SDK call on the provider's pool without blocking the event loop.
+
+    The caller's context variables (e.g. the request's usage ledger) are visible in the thread.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(provider), context.run, call)
+
+
+def submit_blocking(provider: str, fn, *args, **kwargs):
+    """Fire-and-forget version of run_blocking, callable from any thread; returns the concurrent Future"""
+    context = contextvars.copy_context()
+    return get_executor(provider).submit(context.run, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_executors(wait: bool = False):
+    """Stops all provider pools (used on server shutdown)"""
+    for executor in _executors.values():
+        executor.shutdown(wait=wait)
+    _executors.clear()
@@ -0,0 +1,44 @@
+import io
+import os
+import PIL.Image
+import PIL.ImageOps
+
+# Only color, product type and style are extracted, so ~1 MP is plenty
+VISION_MAX_DIM = int(os.getenv("VISION_MAX_DIM", 1024))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", 85))
+
+
+def load_image(data, max_dim: int = VISION_MAX_DIM):
+    """Decodes an upload at (roughly) the target size, upright and in RGB"""
+    img = PIL.Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+        img.draft("RGB", (max_dim, max_dim))
+    img.load()
+
+    # Downscale before rotating so the transpose touches fewer pixels
+    if max(img.size) > max_dim:
+        img.thumbnail((max_dim, max_dim), PIL.Image.BICUBIC)
+    img = PIL.ImageOps.exif_transpose(img)
+
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        # JPEG has no alpha channel; flatten onto white like a product page would
+        img = img.convert("RGBA")
+        background = PIL.Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def encode_jpeg(img, quality: int = VISION_JPEG_QUALITY) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def prepare_image(data, max_dim: int = VISION_MAX_DIM, quality: int = VISION_JPEG_QUALITY):
+    """Returns (PIL image, JPEG bytes) ready to send to the vision model"""
+    img = load_image(data, max_dim)
+    return img, encode_jpeg(img, quality)
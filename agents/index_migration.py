@@ -0,0 +1,102 @@
+import time
+import threading
+
+
+def top_k_overlap(primary_ids, shadow_ids) -> float:
+    """Fraction of the primary top-k that the shadow index also returned"""
+    primary_ids = list(primary_ids)
+    if not primary_ids:
+        return 1.0 if not list(shadow_ids) else 0.0
+    return len(set(primary_ids) & set(shadow_ids)) / len(primary_ids)
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class DualReadStats:
+    """Running comparison between the live index and a migration target"""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._overlaps = []
+        self._primary_ms = []
+        self._shadow_ms = []
+        self._lock = threading.Lock()
+
+    def record(self, overlap: float, primary_ms: float, shadow_ms: float):
+        with self._lock:
+            for samples, value in ((self._overlaps, overlap), (self._primary_ms, primary_ms), (self._shadow_ms, shadow_ms)):
+                samples.append(value)
+                if len(samples) > self.max_samples:
+                    del samples[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = len(self._overlaps)
+            return {
+                "samples": count,
+                "mean_overlap": round(sum(self._overlaps) / count, 4) if count else 0.0,
+                "primary_p50_ms": round(percentile(self._primary_ms, 0.5), 2),
+                "primary_p95_ms": round(percentile(self._primary_ms, 0.95), 2),
+                "shadow_p50_ms": round(percentile(self._shadow_ms, 0.5), 2),
+                "shadow_p95_ms": round(percentile(self._shadow_ms, 0.95), 2)
+            }
+
+
+def iterate_records(index, batch_size: int = 100):
+    """Yields pages of (id, metadata) from a Pinecone index"""
+    for page in index.list():
+        # Older SDKs yield lists of IDs, newer ones ListResponse pages
+        ids = page if isinstance(page, list) else [v.id for v in page.vectors]
+        for start in range(0, len(ids), batch_size):
+            fetched = index.fetch(ids=ids[start:start + batch_size])
+            yield [(vid, vec.metadata or {}) for vid, vec in fetched.vectors.items()]
+
+
+def migrate_corpus(agent, target, dimension: int, batch_size: int = 50) -> int:
+    """Re-embeds every record of the live index at `dimension` into the `target` index handle"""
+    copied, skipped = 0, 0
+    for page in iterate_records(agent.index, batch_size):
+        records = [(vector_id, metadata) for vector_id, metadata in page if metadata.get("text")]
+        skipped += len(page) - len(records) # Nothing to re-embed from
+        # Raises on failure, so a migration never writes zero vectors
+        embeddings = agent.embed_batch([metadata["text"] for _, metadata in records], dimension=dimension)
+        vectors = [
+            {"id": vector_id, "values": values, "metadata": metadata}
+            for (vector_id, metadata), values in zip(records, embeddings)
+        ]
+        if vectors:
+            target.upsert(vectors=vectors)
+            copied += len(vectors)
+            print(f"📦 Copied {copied} records...")
+    if skipped:
+        print(f"⚠️ Skipped {skipped} records without 'text' metadata")
+    return copied
+
+
+def compare_indexes(agent, target_index, dimension: int, queries, top_k: int = 5) -> dict:
+    """Queries both indexes for each query and measures top-k overlap and latency"""
+    stats = DualReadStats()
+    for query in queries:
+        primary_vector = agent._get_embedding(query)
+        shadow_vector = agent._get_embedding(query, dimension=dimension)
+        if primary_vector is None or shadow_vector is None:
+            continue # Embedding unavailable; nothing meaningful to compare
+
+        start = time.perf_counter()
+        primary = agent.index.query(vector=primary_vector, top_k=top_k, include_metadata=False)
+        primary_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        shadow = target_index.query(vector=shadow_vector, top_k=top_k, include_metadata=False)
+        shadow_ms = (time.perf_counter() - start) * 1000
+
+        stats.record(
+            top_k_overlap([m.id for m in primary.matches], [m.id for m in shadow.matches]),
+            primary_ms, shadow_ms
+        )
+    return stats.stats()
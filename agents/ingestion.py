@@ -0,0 +1,262 @@
+import os
+import csv
+import json
+import time
+import asyncio
+import hashlib
+from agents.executor import run_blocking
+from agents.manifest import content_hash
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 100)) # Records per embedding batch and upsert
+DEFAULT_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 4)) # Embedding batches running at once
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", 8)) # Chunks read ahead / upserts pending
+CHECKPOINT_EVERY = 10 # Chunks between checkpoints (and local index saves)
+DELETE_BATCH_SIZE = 1000 # Pinecone's limit per delete call
+RETRIES = 3
+
+
+class IngestionError(Exception):
+    """Raised when a chunk still fails after retries; the checkpoint stays at the last good offset"""
+
+
+def read_records(path: str):
+    """Yields trend records (dicts) from a JSONL or CSV file"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def record_id(record: dict) -> str:
+    text = record["text"]
+    return str(record.get("id") or f"trend_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}")
+
+
+def to_vector(record: dict, values, digest: str = None) -> dict:
+    """Pinecone record for a trend; everything except id is kept as metadata"""
+    metadata = {}
+    for key, value in record.items():
+        if key == "id" or value is None or value == "":
+            continue
+        # Pinecone metadata only holds scalars and lists of strings
+        metadata[key] = json.dumps(value) if isinstance(value, dict) else value
+    if digest:
+        metadata["content_hash"] = digest
+    return {"id": record_id(record), "values": values, "metadata": metadata}
+
+
+class Checkpoint:
+    """Number of leading source records that are safely in the index, stored as JSON.
+
+    `run` identifies one full pass over the source; a resumed pass keeps its run
+    so the manifest can tell which records the pass has seen. Without a path the
+    checkpoint only lives in memory.
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+        self.offset = 0
+        self.ingested = 0
+        self.run = str(time.time_ns())
+        self.complete = False
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        # A finished pass, or a checkpoint for another file, starts a new pass
+        if data.get("source") == self.source and not data.get("complete"):
+            self.offset = data.get("offset", 0)
+            self.ingested = data.get("ingested", 0)
+            self.run = data.get("run", self.run)
+        return self
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": self.source,
+                "run": self.run,
+                "offset": self.offset,
+                "ingested": self.ingested,
+                "complete": self.complete,
+                "updated_at": time.time()
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+async def _with_retries(provider, fn, *args):
+    for attempt in range(RETRIES):
+        try:
+            return await run_blocking(provider, fn, *args)
+        except Exception as e:
+            if attempt == RETRIES - 1:
+                raise
+            print(f"⚠️ {provider} call failed ({e}), retrying...")
+            await asyncio.sleep(2 ** attempt)
+
+
+async def ingest(agent, path: str, checkpoint_path: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 restart: bool = False, manifest=None, prune: bool = False, full: bool = False) -> dict:
+    """Streams records from a JSONL/CSV file into the memory index, resuming from the checkpoint"""
+    checkpoint = Checkpoint(checkpoint_path or f"{path}.checkpoint.json", os.path.abspath(path))
+    if not restart:
+        checkpoint.load()
+    if checkpoint.offset:
+        print(f"⏩ Resuming after record {checkpoint.offset} ({checkpoint.ingested} already ingested)")
+    return await _ingest(agent, read_records(path), checkpoint, chunk_size, concurrency, max_in_flight, manifest, prune, full)
+
+
+async def ingest_records(agent, records, source: str, manifest=None, prune: bool = False,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE, concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """Same as ingest() for an in-memory list of records (the seeding scripts); no checkpoint file"""
+    checkpoint = Checkpoint(None, source)
+    return await _ingest(agent, iter(records), checkpoint, chunk_size, concurrency, DEFAULT_MAX_IN_FLIGHT, manifest, prune)
+
+
+async def _reset_if_empty(agent, manifest, scope):
+    """A manifest for an empty index is left over from a deleted or recreated one;
+    trusting it would skip every record"""
+    try:
+        count = await run_blocking("pinecone", agent.record_count)
+    except Exception as e:
+        print(f"⚠️ Could not count index records ({e}); trusting the manifest")
+        return
+    if count == 0:
+        forgotten = manifest.clear(scope)
+        if forgotten:
+            print(f"🧹 Index is empty: forgot {forgotten} manifest entries for {scope}")
+
+
+async def _ingest(agent, records, checkpoint, chunk_size, concurrency, max_in_flight, manifest, prune, full=False) -> dict:
+    """Each chunk is embedded with one batched Gemini call and written with one
+    upsert. At most `concurrency` embedding calls and `max_in_flight` chunks are
+    outstanding. Chunks can finish out of order, so the checkpoint only advances
+    over the contiguous prefix of finished chunks.
+
+    With a manifest, records whose content hash is unchanged are neither
+    embedded nor upserted (full=True re-embeds them but still records them).
+    With prune=True, a complete pass then deletes the source's records that it
+    did not see.
+    """
+    scope = agent.manifest_scope()
+    if manifest is not None and not full:
+        await _reset_if_empty(agent, manifest, scope)
+    model = agent.embedding_model()
+    embed_semaphore = asyncio.Semaphore(max(1, concurrency))
+    max_in_flight = max(1, max_in_flight)
+    finished = {} # chunk start offset -> (end offset, records written)
+    pending = set()
+    written_hashes = [] # Recorded in the manifest once the writes are durable
+    ingested, unchanged, skipped, chunks_since_checkpoint = 0, 0, 0, 0
+    started = time.perf_counter()
+
+    async def process(start, end, chunk):
+        nonlocal unchanged
+        digests = {record_id(r): content_hash(r["text"], r.get("keywords"), model) for r in chunk}
+        if manifest is not None:
+            known = {} if full else manifest.hashes(scope, digests)
+            same = [vector_id for vector_id, digest in digests.items() if known.get(vector_id) == digest]
+            manifest.touch(scope, checkpoint.source, checkpoint.run, same)
+            unchanged += len(same)
+            chunk = [r for r in chunk if known.get(record_id(r)) != digests[record_id(r)]]
+
+        texts = [r["text"] for r in chunk]
+        async with embed_semaphore:
+            embeddings = await _with_retries("gemini", agent.embed_batch, texts) if texts else []
+        vectors = [to_vector(r, e, digests[record_id(r)]) for r, e in zip(chunk, embeddings)]
+        if vectors:
+            await _with_retries("pinecone", agent.upsert, vectors, False)
+            written_hashes.extend((v["id"], v["metadata"]["content_hash"]) for v in vectors)
+        return start, end, len(vectors)
+
+    async def persist():
+        await run_blocking("pinecone", agent.flush)
+        if manifest is not None and written_hashes:
+            manifest.record(scope, checkpoint.source, checkpoint.run, written_hashes)
+            written_hashes.clear()
+
+    async def checkpoint_now():
+        await persist()
+        checkpoint.save()
+        rate = ingested / max(time.perf_counter() - started, 1e-9)
+        print(f"📥 {checkpoint.ingested} ingested, {unchanged} unchanged, offset {checkpoint.offset} ({rate:.1f} items/s)")
+
+    async def collect(return_when):
+        nonlocal ingested, chunks_since_checkpoint
+        done, _ = await asyncio.wait(pending, return_when=return_when)
+        for task in done:
+            pending.discard(task)
+            start, end, written = task.result() # Re-raises a chunk that failed after retries
+            finished[start] = (end, written)
+        while checkpoint.offset in finished:
+            end, written = finished.pop(checkpoint.offset)
+            checkpoint.offset = end
+            checkpoint.ingested += written
+            ingested += written
+            chunks_since_checkpoint += 1
+        if chunks_since_checkpoint >= CHECKPOINT_EVERY:
+            chunks_since_checkpoint = 0
+            await checkpoint_now()
+
+    position, chunk_start, chunk = 0, checkpoint.offset, []
+    try:
+        for record in records:
+            position += 1
+            if position <= checkpoint.offset:
+                continue
+            if record.get("text"):
+                chunk.append(record)
+            else:
+                skipped += 1 # Nothing to embed
+            if position - chunk_start < chunk_size:
+                continue
+            if len(pending) >= max_in_flight:
+                await collect(asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(process(chunk_start, position, chunk)))
+            chunk_start, chunk = position, []
+
+        if position > chunk_start:
+            pending.add(asyncio.create_task(process(chunk_start, position, chunk)))
+        while pending:
+            await collect(asyncio.FIRST_COMPLETED)
+    except Exception as e:
+        for task in pending:
+            task.cancel()
+        await checkpoint_now()
+        raise IngestionError(f"Ingestion stopped at record {checkpoint.offset}: {e}") from e
+
+    deleted = 0
+    if prune and manifest is not None:
+        await persist() # Rewritten records must carry this run before looking for stale ones
+        stale = manifest.stale(scope, checkpoint.source, checkpoint.run)
+        for start in range(0, len(stale), DELETE_BATCH_SIZE):
+            batch = stale[start:start + DELETE_BATCH_SIZE]
+            await _with_retries("pinecone", agent.delete, batch)
+            manifest.remove(scope, batch)
+            deleted += len(batch)
+        if deleted:
+            print(f"🗑️ Deleted {deleted} records no longer in the source")
+
+    checkpoint.complete = True
+    await checkpoint_now()
+    elapsed = time.perf_counter() - started
+    return {
+        "ingested": ingested,
+        "unchanged": unchanged,
+        "deleted": deleted,
+        "skipped": skipped,
+        "total_ingested": checkpoint.ingested,
+        "offset": checkpoint.offset,
+        "elapsed_seconds": round(elapsed, 2),
+        "items_per_second": round(ingested / elapsed, 1) if elapsed else 0.0
+    }
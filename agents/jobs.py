@@ -0,0 +1,296 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+# Finished jobs (results included) are dropped after JOB_TTL_SECONDS, and beyond the
+# newest JOB_MAX_FINISHED; queued and running jobs are never evicted
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", 24 * 3600))
+JOB_MAX_FINISHED = int(os.getenv("JOB_MAX_FINISHED", 1000))
+# Jobs waiting for a worker; each holds its uploaded images in memory until it runs
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", 100))
+# Progress is served from memory and written to the store at most this often per job
+JOB_PROGRESS_SAVE_SECONDS = float(os.getenv("JOB_PROGRESS_SAVE_SECONDS", 2))
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when JOB_MAX_QUEUED jobs are already waiting"""
+
+
+def _new_job(kind: str, total: int) -> dict:
+    now = time.time()
+    return {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": QUEUED,
+        "progress": {"done": 0, "total": total},
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+class MemoryJobStore:
+    """In-process job state (lost on restart)"""
+
+    def __init__(self, ttl: float = JOB_TTL_SECONDS, max_finished: int = JOB_MAX_FINISHED):
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._finished = OrderedDict() # id -> finished at, oldest first
+        self._lock = threading.Lock()
+
+    def save(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            if job["status"] in FINISHED_STATES:
+                self._finished[job["id"]] = job["updated_at"]
+                self._finished.move_to_end(job["id"])
+                self._evict(time.time())
+
+    def _evict(self, now: float):
+        cutoff = now - self.ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at >= cutoff and len(self._finished) <= self.max_finished:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, status: str = None, limit: int = 50):
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs.values() if status is None or j["status"] == status]
+        jobs.sort(key=lambda j: j["created_at"], reverse=True)
+        return jobs[:limit]
+
+    def recover(self):
+        return 0
+
+
+class SQLiteJobStore:
+    """Job state persisted in SQLite so finished jobs survive a restart"""
+
+    def __init__(self, path: str = "jobs.sqlite3", ttl: float = JOB_TTL_SECONDS, max_finished: int = JOB_MAX_FINISHED):
+        self.path = path
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                done INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)")
+        self._conn.commit()
+
+    def _row_to_job(self, row):
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "progress": {"done": row[3], "total": row[4]},
+            "result": json.loads(row[5]) if row[5] is not None else None,
+            "error": row[6],
+            "created_at": row[7],
+            "updated_at": row[8]
+        }
+
+    def save(self, job: dict):
+        result = json.dumps(job["result"]) if job["result"] is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job["id"], job["kind"], job["status"], job["progress"]["done"],
+                 job["progress"]["total"], result, job["error"],
+                 job["created_at"], job["updated_at"])
+            )
+            if job["status"] in FINISHED_STATES:
+                self._evict(time.time())
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (*FINISHED_STATES, now - self.ttl)
+        )
+        self._conn.execute(
+            """DELETE FROM jobs WHERE status IN (?, ?) AND id NOT IN (
+                SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY updated_at DESC LIMIT ?
+            )""",
+            (*FINISHED_STATES, *FINISHED_STATES, self.max_finished)
+        )
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, status: str = None, limit: int = 50):
+        query = "SELECT * FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def recover(self):
+        """Inputs of unfinished jobs lived in the old process, so they cannot be resumed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+                (FAILED, "Interrupted by server restart", time.time(), QUEUED, RUNNING)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+def create_job_store():
+    """Picks the job store from JOB_STORE ('memory' or 'sqlite')"""
+    if os.getenv("JOB_STORE", "memory").lower() == "sqlite":
+        return SQLiteJobStore(os.getenv("JOB_DB_PATH", "jobs.sqlite3"))
+    return MemoryJobStore()
+
+
+class JobManager:
+    """Queue + worker pool that runs long catalog work in the background.
+
+    Queued and running jobs are served from memory. Store writes go to a single
+    writer thread, so they land in order and a SQLite commit never blocks the loop.
+    """
+
+    def __init__(self, store=None, workers: int = None, max_queued: int = JOB_MAX_QUEUED):
+        self.store = store or create_job_store()
+        self.workers = workers or int(os.getenv("JOB_WORKERS", 4))
+        self.max_queued = max_queued
+        self._queue = None # Created in start(), on the server's loop
+        self._tasks = []
+        self._active = {} # id -> queued or running job
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-io")
+
+    def start(self):
+        recovered = self.store.recover()
+        if recovered:
+            print(f"⚠️ Marked {recovered} unfinished jobs as failed after restart")
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"✅ Job workers online ({self.workers})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._writer.shutdown(wait=True) # Let queued store writes finish
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, kind: str, work, total: int = 1) -> dict:
+        """Queues `work(progress)` and returns the job immediately.
+
+        `work` is an async callable; it receives progress(done, total) and its
+        return value (JSON-serializable) becomes the job result.
+        """
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() must be called before jobs are submitted")
+        if self._queue.full():
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting), retry later")
+        job = _new_job(kind, total)
+        self._active[job["id"]] = job
+        self._save(job)
+        self._queue.put_nowait((job, work))
+        return _snapshot(job)
+
+    def get(self, job_id: str):
+        job = self._active.get(job_id)
+        return _snapshot(job) if job is not None else self.store.get(job_id)
+
+    def list(self, status: str = None, limit: int = 50):
+        jobs = self.store.list(status=status, limit=limit)
+        return [_snapshot(self._active[j["id"]]) if j["id"] in self._active else j for j in jobs]
+
+    def _save(self, job: dict):
+        """Queues a write of the job as it is now; returns the write's future"""
+        future = self._writer.submit(self.store.save, _snapshot(job))
+        future.add_done_callback(_log_save_error)
+        return future
+
+    def _update(self, job: dict, **fields):
+        job.update(fields)
+        job["updated_at"] = time.time()
+        return self._save(job)
+
+    async def _worker(self):
+        while True:
+            job, work = await self._queue.get()
+            try:
+                await self._execute(job, work)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: dict, work):
+        self._update(job, status=RUNNING)
+        last_saved = [time.time()]
+
+        def progress(done: int, total: int = None):
+            # May be called from a pool thread (merch batch); only the dict is touched inline
+            total = job["progress"]["total"] if total is None else total
+            job["progress"] = {"done": done, "total": total}
+            job["updated_at"] = now = time.time()
+            if now - last_saved[0] >= JOB_PROGRESS_SAVE_SECONDS:
+                last_saved[0] = now
+                self._save(job)
+
+        try:
+            result = await work(progress)
+            done = job["progress"]["total"]
+            saved = self._update(job, status=SUCCEEDED, result=result, progress={"done": done, "total": done})
+        except Exception as e:
+            print(f"❌ Job {job['id']} failed: {e}")
+            saved = self._update(job, status=FAILED, error=str(e))
+        try:
+            await asyncio.wrap_future(saved) # Readers fall back to the store once the job leaves _active
+        except Exception:
+            pass # Logged by _log_save_error
+        finally:
+            self._active.pop(job["id"], None)
+
+
+def _snapshot(job: dict) -> dict:
+    return {**job, "progress": dict(job["progress"])}
+
+
+def _log_save_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"⚠️ Job store write failed: {future.exception()}")
@@ -0,0 +1,97 @@
+import json
+
+
+class JsonFieldParser:
+    """Incremental parser for a streamed top-level JSON object.
+
+    feed() takes the next chunk of model output and returns the top-level
+    (key, value) pairs completed by it, in the order they were written. Text
+    before the opening brace (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key" # key -> colon -> value -> comma, at depth 1
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        fields = []
+        while self._pos < len(self.buffer) and not self.done:
+            i, c = self._pos, self.buffer[self._pos]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key":
+                        self._key = self._decode(self._key_start, i + 1)
+                        self._expect = "colon"
+                    elif self._depth == 1 and self._expect == "value":
+                        self._emit(fields, i + 1)
+                continue
+
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == "key":
+                    self._key_start = i
+                elif self._depth == 1 and self._expect == "value" and self._value_start is None:
+                    self._value_start = i
+            elif c in "{[":
+                if self._depth == 1 and self._expect == "value" and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value":
+                    self._emit(fields, i + 1)
+                elif self._depth == 0:
+                    if self._expect == "value" and self._value_start is not None:
+                        self._emit(fields, i)
+                    self.done = True
+            elif self._depth == 1:
+                if c == ":" and self._expect == "colon":
+                    self._expect = "value"
+                    self._value_start = None
+                elif c == ",":
+                    if self._expect == "value" and self._value_start is not None:
+                        self._emit(fields, i)
+                    self._expect = "key"
+                elif not c.isspace() and self._expect == "value" and self._value_start is None:
+                    self._value_start = i # number, true, false or null
+        return fields
+
+    def _decode(self, start: int, end: int):
+        return json.loads(self.buffer[start:end].strip())
+
+    def _emit(self, fields: list, end: int):
+        try:
+            fields.append((self._key, self._decode(self._value_start, end)))
+        except ValueError:
+            pass # Malformed value: the final json.loads of the whole text reports it
+        self._expect = "comma"
+        self._value_start = None
+
+
+def parse_json_text(text: str):
+    """json.loads for model output that may be wrapped in a markdown code fence"""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("No JSON object in model output")
+    return json.loads(text[start:end + 1])
@@ -0,0 +1,37 @@
+MAX_KEYWORDS = 10
+POSITION_DECAY = 0.1 # Keywords listed earlier in a trend's metadata count slightly more
+
+
+def split_keywords(value) -> list:
+    if isinstance(value, (list, tuple)):
+        return [str(k).strip() for k in value if str(k).strip()]
+    return [k.strip() for k in str(value or "").split(",") if k.strip()]
+
+
+def aggregate_keywords(matches, top_n: int = MAX_KEYWORDS, min_score: float = None) -> list:
+    """Ranks keywords across query matches. Returns [(keyword, score)], best first.
+
+    Each keyword earns its match's score (discounted by its position in that
+    match's list), summed over every match that mentions it, so keywords that
+    are both strongly matched and frequent come first. Keywords are deduplicated
+    case-insensitively and keep the spelling they were first seen with. Ties
+    break on first appearance in rank order, so the same matches always give
+    the same output. Scores are normalized so the best keyword scores 1.0.
+    """
+    totals = {} # normalized keyword -> [score, first seen, display form]
+    seen = 0
+    for match in matches:
+        if min_score is not None and match.score <= min_score:
+            continue
+        weight = max(float(match.score), 0.0)
+        for position, keyword in enumerate(split_keywords((match.metadata or {}).get("keywords"))):
+            key = keyword.lower()
+            entry = totals.get(key)
+            if entry is None:
+                entry = totals[key] = [0.0, seen, keyword]
+                seen += 1
+            entry[0] += weight / (1 + POSITION_DECAY * position)
+
+    ranked = sorted(totals.values(), key=lambda entry: (-entry[0], entry[1]))[:top_n]
+    best = ranked[0][0] if ranked and ranked[0][0] > 0 else 1.0
+    return [(keyword, round(score / best, 4)) for score, _, keyword in ranked]
@@ -0,0 +1,109 @@
+import os
+import time
+import asyncio
+import itertools
+import threading
+from agents.embedding_cache import normalize_text
+
+DEFAULT_STYLES = "streetwear,minimalist,vintage,y2k,gorpcore,coquette,old money,athleisure,bohemian,preppy"
+DEFAULT_TYPES = "t-shirt,hoodie,sweatshirt,jacket,dress,leggings,sweater,tote bag,mug,poster"
+
+KEYWORD_TABLE_STYLES = [s.strip() for s in os.getenv("KEYWORD_TABLE_STYLES", DEFAULT_STYLES).split(",") if s.strip()]
+KEYWORD_TABLE_TYPES = [t.strip() for t in os.getenv("KEYWORD_TABLE_TYPES", DEFAULT_TYPES).split(",") if t.strip()]
+KEYWORD_TABLE_MAX_ENTRIES = int(os.getenv("KEYWORD_TABLE_MAX_ENTRIES", 5000))
+KEYWORD_TABLE_REFRESH_SECONDS = float(os.getenv("KEYWORD_TABLE_REFRESH_SECONDS", 30))
+# Other processes (ingest_trends.py, the seeding scripts) can change Pinecone without bumping our version
+KEYWORD_TABLE_MAX_AGE = float(os.getenv("KEYWORD_TABLE_MAX_AGE", 3600))
+KEYWORD_TABLE_CONCURRENCY = int(os.getenv("KEYWORD_TABLE_CONCURRENCY", 4))
+
+
+class KeywordTable:
+    """Materialized keywords for "{design_style} {product_type}" memory queries.
+
+    The table holds the configured style x type grid plus every query seen
+    live. A background loop rebuilds it whenever the memory index version
+    changes (or the table is older than KEYWORD_TABLE_MAX_AGE), so the request
+    path is a dict lookup instead of an embedding call and a vector query.
+    """
+
+    def __init__(self, styles=KEYWORD_TABLE_STYLES, types=KEYWORD_TABLE_TYPES, max_entries: int = KEYWORD_TABLE_MAX_ENTRIES):
+        self.configured = [normalize_text(f"{s} {t}") for s, t in itertools.product(styles, types)]
+        self.max_entries = max_entries
+        self.version = None
+        self.built_at = 0.0
+        self._table = {}
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "refreshes": 0}
+        self.last_refresh_seconds = 0.0
+
+    def lookup(self, query: str):
+        key = normalize_text(query)
+        with self._lock:
+            keywords = self._table.get(key)
+            self.counters["hits" if keywords is not None else "misses"] += 1
+            return list(keywords) if keywords is not None else None
+
+    def remember(self, query: str, keywords):
+        """Stores a live result; the query joins the set that future refreshes recompute"""
+        key = normalize_text(query)
+        with self._lock:
+            if key in self._table or len(self._table) < self.max_entries:
+                self._table[key] = list(keywords)
+
+    def is_stale(self, version) -> bool:
+        return version != self.version or time.time() - self.built_at > KEYWORD_TABLE_MAX_AGE
+
+    async def refresh(self, compute, version, concurrency: int = KEYWORD_TABLE_CONCURRENCY):
+        """Recomputes every configured and observed query, then swaps the table.
+
+        `await compute(query)` returns (keywords, complete). An incomplete result
+        (a provider was down) keeps the previous entry if there is one.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            queries = list(dict.fromkeys(self.configured + list(self._table)))[:self.max_entries]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def build(query):
+            async with semaphore:
+                return query, await compute(query)
+
+        results = await asyncio.gather(*[build(q) for q in queries])
+        with self._lock:
+            table = {}
+            for query, (keywords, complete) in results:
+                if complete or query not in self._table:
+                    table[query] = keywords
+                else:
+                    table[query] = self._table[query]
+            self._table = table
+            # Retry on the next tick if a provider was down for part of the rebuild
+            self.version = version if all(complete for _, (_, complete) in results) else None
+            self.built_at = time.time()
+            self.counters["refreshes"] += 1
+        self.last_refresh_seconds = time.perf_counter() - started
+        print(f"📚 Keyword table rebuilt: {len(table)} queries in {self.last_refresh_seconds:.1f}s (index version {version})")
+
+    async def run(self, compute, current_version, interval: float = KEYWORD_TABLE_REFRESH_SECONDS):
+        """Background loop: rebuild whenever `await current_version()` moves on"""
+        while True:
+            try:
+                version = await current_version()
+                if self.is_stale(version):
+                    await self.refresh(compute, version)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Keyword table refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._table),
+                "index_version": self.version,
+                "last_refresh_seconds": round(self.last_refresh_seconds, 2)
+            }
@@ -0,0 +1,220 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from agents.metrics import STAGE_LATENCY
+from agents.circuit_breaker import CircuitOpenError
+
+# USD per million (input, output) tokens; update when provider pricing changes
+MODEL_PRICES = {
+    "models/gemini-flash-latest": (0.30, 2.50),
+    "models/gemini-embedding-001": (0.15, 0.0),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+_current = contextvars.ContextVar("usage_ledger", default=None)
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _empty_totals() -> dict:
+    return {
+        "calls": 0, "failed": 0, "input_tokens": 0, "output_tokens": 0, "image_tokens": 0,
+        "latency_ms": 0.0, "cost_usd": 0.0
+    }
+
+
+def _add(totals: dict, entry: dict):
+    totals["calls"] += 1
+    totals["failed"] += entry["status"] != "ok"
+    for field in ("input_tokens", "output_tokens", "image_tokens", "latency_ms", "cost_usd"):
+        totals[field] += entry[field]
+
+
+def _rounded(totals: dict) -> dict:
+    return {**totals, "latency_ms": round(totals["latency_ms"], 1), "cost_usd": round(totals["cost_usd"], 6)}
+
+
+class Ledger:
+    """Provider calls made on behalf of one request (shared by its tasks and pool threads)"""
+
+    def __init__(self):
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict):
+        with self._lock:
+            self.entries.append(entry)
+
+    def summary(self) -> dict:
+        with self._lock:
+            entries = list(self.entries)
+        stages, total = {}, _empty_totals()
+        for entry in entries:
+            _add(stages.setdefault(entry["stage"], _empty_totals()), entry)
+            _add(total, entry)
+        return {
+            "calls": entries,
+            "stages": {stage: _rounded(totals) for stage, totals in stages.items()},
+            "total": _rounded(total)
+        }
+
+
+class UsageStats:
+    """Process-wide totals per stage and per (stage, model, prompt version)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._prompts = {}
+
+    def add(self, entry: dict):
+        with self._lock:
+            _add(self._stages.setdefault(entry["stage"], _empty_totals()), entry)
+            key = (entry["stage"], entry["model"], entry["prompt_version"])
+            _add(self._prompts.setdefault(key, _empty_totals()), entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {stage: _rounded(totals) for stage, totals in self._stages.items()},
+                "prompts": [
+                    {"stage": stage, "model": model, "prompt_version": version, **_rounded(totals)}
+                    for (stage, model, version), totals in self._prompts.items()
+                ]
+            }
+
+
+USAGE = UsageStats()
+
+
+@contextmanager
+def request_ledger():
+    """Collects every provider call made inside the block, including calls made
+    from run_blocking threads and tasks spawned inside it"""
+    ledger = Ledger()
+    token = _current.set(ledger)
+    try:
+        yield ledger
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass # Closed from another context (e.g. a streaming response the client abandoned)
+
+
+def current_ledger():
+    return _current.get()
+
+
+def call_status(error) -> str:
+    """Outcome of a provider call that raised: rejected (breaker open), timeout or error"""
+    if isinstance(error, CircuitOpenError):
+        return "rejected"
+    name = type(error).__name__.lower()
+    if isinstance(error, TimeoutError) or "timeout" in name or "deadline" in name:
+        return "timeout"
+    return "error"
+
+
+def record_call(stage: str, model: str, started: float, input_tokens: int = 0, output_tokens: int = 0,
+                image_tokens: int = 0, prompt_version: str = None, estimated: bool = False, status: str = "ok"):
+    """Records one provider call; `started` is its time.perf_counter() start"""
+    elapsed = time.perf_counter() - started
+    STAGE_LATENCY.observe(elapsed, stage, status)
+    entry = {
+        "stage": stage,
+        "model": model,
+        "prompt_version": prompt_version,
+        "input_tokens": int(input_tokens or 0),
+        "output_tokens": int(output_tokens or 0),
+        "image_tokens": int(image_tokens or 0),
+        "latency_ms": round(elapsed * 1000, 1),
+        "cost_usd": round(call_cost(model, input_tokens or 0, output_tokens or 0), 8),
+        "estimated": estimated,
+        "status": status
+    }
+    USAGE.add(entry)
+    ledger = _current.get()
+    if ledger is not None:
+        ledger.add(entry)
+
+
+class ProviderCall:
+    """Token counts of the call inside a provider_call block"""
+
+    def __init__(self):
+        self.tokens = (0, 0, 0)
+
+    def usage(self, input_tokens: int = 0, output_tokens: int = 0, image_tokens: int = 0):
+        self.tokens = (input_tokens, output_tokens, image_tokens)
+
+
+@contextmanager
+def provider_call(stage: str, model: str, prompt_version: str = None, estimated: bool = False):
+    """Times the block as one provider call and records it whether it returns or raises:
+
+        with provider_call("vision", model, PROMPT_VERSION) as call:
+            response = generate(...)
+            call.usage(*gemini_usage(response))
+    """
+    call, status = ProviderCall(), "ok"
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        status = call_status(e)
+        raise
+    finally:
+        record_call(stage, model, started, *call.tokens, prompt_version=prompt_version,
+                    estimated=estimated, status=status)
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Observes the block in STAGE_LATENCY with its outcome, without a ledger entry
+    (for work that is not a billed provider call, e.g. local vector queries)"""
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        status = call_status(e)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage, status)
+
+
+def groq_usage(usage):
+    """(prompt_tokens, completion_tokens) of a Groq usage object or dict"""
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+
+def gemini_usage(response):
+    """(prompt tokens, output tokens, image tokens) from a Gemini response's usage_metadata"""
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return 0, 0, 0
+    image_tokens = 0
+    for detail in getattr(metadata, "prompt_tokens_details", None) or []:
+        if "IMAGE" in str(getattr(detail, "modality", "")):
+            image_tokens += getattr(detail, "token_count", 0) or 0
+    return (
+        getattr(metadata, "prompt_token_count", 0) or 0,
+        getattr(metadata, "candidates_token_count", 0) or 0,
+        image_tokens
+    )
+
+
+def estimate_tokens(texts) -> int:
+    """~4 characters per token; for APIs that do not report usage (Gemini embeddings)"""
+    if isinstance(texts, str):
+        texts = [texts]
+    return sum(max(1, len(text) // 4) for text in texts)
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import math
+import heapq
+import threading
+from collections import Counter, defaultdict
+from agents.vector_index import Match, QueryResult
+
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join("cache", "lexical_index.json"))
+INDEXED_FIELDS = ("keywords", "text")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> list:
+    return _TOKEN.findall(str(text or "").lower())
+
+
+def file_signature(path: str):
+    """(mtime, size) of a saved index, or None if there is none; changes whenever a process saves it"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LexicalIndex:
+    """BM25 inverted index over the `keywords` and `text` metadata of trend records.
+
+    Exact style terms ("gorpcore", "coquette") that dense similarity tends to
+    blur are matched literally here. Only the indexed fields are kept, and they
+    are persisted as JSON; postings are rebuilt on load.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._docs = {} # id -> {field: value}
+        self._lengths = {} # id -> token count
+        self._postings = defaultdict(dict) # term -> {id: term frequency}
+        self._total_length = 0
+        self.signature = None # file_signature() of the saved copy this index matches
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def upsert(self, records):
+        """Indexes [(id, metadata)]; records without indexed fields are ignored"""
+        with self._lock:
+            for doc_id, metadata in records:
+                fields = {f: metadata[f] for f in INDEXED_FIELDS if metadata and metadata.get(f)}
+                self._remove(doc_id)
+                if not fields:
+                    continue
+                terms = Counter(t for value in fields.values() for t in tokenize(value))
+                self._docs[doc_id] = fields
+                self._lengths[doc_id] = sum(terms.values())
+                self._total_length += self._lengths[doc_id]
+                for term, tf in terms.items():
+                    self._postings[term][doc_id] = tf
+
+    def delete(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        fields = self._docs.pop(doc_id, None)
+        if fields is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in set(t for value in fields.values() for t in tokenize(value)):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, top_k: int = 5):
+        """Returns (QueryResult, coverage): BM25 top-k plus the share of query terms the best match contains"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not terms or not self._docs:
+                return QueryResult([]), 0.0
+            count = len(self._docs)
+            avg_length = self._total_length / count
+            scores = defaultdict(float)
+            matched = defaultdict(int)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+                    matched[doc_id] += 1
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], matched[item[0]]))
+            matches = [Match(doc_id, score, dict(self._docs[doc_id])) for doc_id, score in best]
+            coverage = matched[best[0][0]] / len(terms) if best else 0.0
+            return QueryResult(matches), coverage
+
+    # --- Persistence ---
+    def save(self, path: str = None):
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            payload = json.dumps(self._docs)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        if path == self.path:
+            self.signature = file_signature(path)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH):
+        index = cls(path=path)
+        # Taken before reading, so a save racing with the read is picked up by the next reload check
+        index.signature = file_signature(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                docs = json.load(f)
+        except (OSError, ValueError):
+            return index
+        index.upsert(docs.items())
+        return index
+
+
+def reciprocal_rank_fusion(result_lists, top_k: int = 5, k: int = 60):
+    """Merges ranked QueryResults: score(d) = sum(1 / (k + rank)). Keeps the first metadata seen per id"""
+    scores = defaultdict(float)
+    metadata = {}
+    for results in result_lists:
+        for rank, match in enumerate(results.matches, start=1):
+            scores[match.id] += 1.0 / (k + rank)
+            metadata.setdefault(match.id, match.metadata)
+    best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+    return QueryResult([Match(doc_id, score, metadata[doc_id]) for doc_id, score in best])
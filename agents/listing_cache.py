@@ -0,0 +1,169 @@
+import os
+import json
+import threading
+import numpy as np
+from agents.cache import ResultCache, make_key
+from agents.embedding_cache import normalize_text
+
+# Cosine similarity above which a listing is reused for different inputs; 0 disables the tier
+LISTING_SEMANTIC_THRESHOLD = float(os.getenv("LISTING_SEMANTIC_THRESHOLD", 0))
+LISTING_SEMANTIC_ENTRIES = int(os.getenv("LISTING_SEMANTIC_ENTRIES", 2000))
+
+# Vision fields that describe the product; anything else (e.g. "error") stays out of the key
+INPUT_FIELDS = ("main_color", "product_type", "design_style", "visual_features")
+
+
+def _canonical_value(value):
+    if isinstance(value, (list, tuple)):
+        return sorted(dict.fromkeys(normalize_text(v) for v in value if normalize_text(v)))
+    return normalize_text(value if value is not None else "")
+
+
+def canonical_input(visual_data: dict, seo_keywords: list) -> dict:
+    """Order- and case-insensitive form of the writer's input"""
+    canonical = {field: _canonical_value(visual_data.get(field)) for field in INPUT_FIELDS}
+    canonical["keywords"] = _canonical_value(seo_keywords or [])
+    return canonical
+
+
+def describe_input(canonical: dict) -> str:
+    """Flat text of a canonical input, embedded by the semantic tier"""
+    parts = []
+    for field, value in canonical.items():
+        parts.append(f"{field}: {', '.join(value) if isinstance(value, list) else value}")
+    return " | ".join(parts)
+
+
+def usage_tokens(usage) -> int:
+    """Total tokens of a Groq usage object (or dict); 0 if unknown"""
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return int(usage.get("total_tokens") or 0)
+    return int(getattr(usage, "total_tokens", 0) or 0)
+
+
+class SemanticRing:
+    """Fixed-capacity ring of unit vectors and their exact-cache keys.
+
+    The matrix is allocated once; a new entry overwrites the oldest row in
+    place instead of copying the whole matrix. Not thread-safe on its own.
+    """
+
+    def __init__(self, capacity: int, dimension: int):
+        self.matrix = np.zeros((max(1, capacity), dimension), dtype=np.float32)
+        self.keys = [None] * len(self.matrix)
+        self.count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, vector, key: str):
+        self.matrix[self._next] = vector
+        self.keys[self._next] = key
+        self._next = (self._next + 1) % len(self.keys)
+        self.count = min(self.count + 1, len(self.keys))
+
+    def best(self, query):
+        """(score, key) of the most similar stored vector"""
+        scores = self.matrix[:self.count] @ query
+        row = int(np.argmax(scores))
+        return float(scores[row]), self.keys[row]
+
+
+class ListingCache:
+    """Writer results keyed on (canonical input, model, prompt version).
+
+    The exact tier is a ResultCache. The optional semantic tier embeds each
+    stored input with `embed(text) -> vector | None` and serves the stored
+    listing whose input is the most similar, if that similarity is at least
+    `threshold`. Every hit adds the Groq tokens its listing cost to tokens_saved.
+    """
+
+    def __init__(self, embed=None, threshold: float = LISTING_SEMANTIC_THRESHOLD,
+                 max_semantic_entries: int = LISTING_SEMANTIC_ENTRIES):
+        self.exact = ResultCache("listings")
+        self.embed = embed if threshold > 0 else None
+        self.threshold = threshold
+        self.max_semantic_entries = max_semantic_entries
+        self._semantic = {} # (model, prompt version) -> SemanticRing
+        self._lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "sets": 0, "tokens_saved": 0}
+
+    def _key(self, canonical: dict, model: str, prompt_version: str) -> str:
+        return make_key("listing", json.dumps(canonical, sort_keys=True), model, prompt_version)
+
+    def _embed(self, canonical: dict):
+        try:
+            vector = self.embed(describe_input(canonical))
+        except Exception as e:
+            print(f"⚠️ Listing cache embedding failed: {e}")
+            return None
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def get(self, visual_data: dict, seo_keywords: list, model: str, prompt_version: str):
+        canonical = canonical_input(visual_data, seo_keywords)
+        entry = self.exact.get(self._key(canonical, model, prompt_version))
+        tier = "exact_hits"
+        if entry is None and self.embed is not None:
+            entry = self._semantic_get(canonical, (model, prompt_version))
+            tier = "semantic_hits"
+        with self._lock:
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters[tier] += 1
+            self.counters["tokens_saved"] += entry.get("tokens", 0)
+        return entry["listing"]
+
+    def _semantic_get(self, canonical: dict, scope):
+        with self._lock:
+            if scope not in self._semantic:
+                return None
+        query = self._embed(canonical)
+        if query is None:
+            return None
+        with self._lock:
+            ring = self._semantic.get(scope)
+            if ring is None or query.shape[0] != ring.matrix.shape[1]:
+                return None
+            score, key = ring.best(query) # Under the lock: set() overwrites rows in place
+        if score < self.threshold:
+            return None
+        return self.exact.get(key)
+
+    def set(self, visual_data: dict, seo_keywords: list, model: str, prompt_version: str, listing: dict, tokens: int = 0):
+        canonical = canonical_input(visual_data, seo_keywords)
+        key = self._key(canonical, model, prompt_version)
+        self.exact.set(key, {"listing": listing, "tokens": tokens})
+        with self._lock:
+            self.counters["sets"] += 1
+        if self.embed is None:
+            return
+        vector = self._embed(canonical)
+        if vector is None:
+            return
+        scope = (model, prompt_version)
+        with self._lock:
+            ring = self._semantic.get(scope)
+            if ring is None or ring.matrix.shape[1] != vector.shape[0]:
+                # First entry, or the embedding dimension changed: start over
+                ring = self._semantic[scope] = SemanticRing(self.max_semantic_entries, vector.shape[0])
+            ring.add(vector, key) # Overwrites the oldest entry once full
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "semantic_hit_rate": round(self.counters["semantic_hits"] / lookups, 4) if lookups else 0.0,
+                "semantic_enabled": self.embed is not None,
+                "semantic_entries": sum(len(ring) for ring in self._semantic.values())
+            }
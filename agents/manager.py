@@ -2,8 +2,8 @@ import csv
 import time
 import os
 import datetime
-from agents.trend_spotter import TrendSpotter
-from agents.visionary import Visionary
+from legacy.trend_spotter import TrendSpotter
+from legacy.visionary import Visionary
 
 class MerchManager:
     def __init__(self):
@@ -13,7 +13,7 @@ class MerchManager:
         if not os.path.exists(self.results_dir):
             os.makedirs(self.results_dir)
 
-    def generate_batch(self, niche: str) -> str:
+    def generate_batch(self, niche: str, progress_callback=None) -> str:
         # Step 1: Get slogans
         print(f"🔍 Analyzing trends for niche: {niche}...")
         slogans = self.trend_spotter.get_trends(niche)
@@ -30,6 +30,8 @@ class MerchManager:
                 "Slogan": slogan,
                 "Art Prompt": prompt
             })
+            if progress_callback:
+                progress_callback(i + 1, len(slogans))
             time.sleep(10)
 
         # Step 3 & 4: Save to CSV
@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join("cache", "index_manifest.sqlite3"))
+
+
+def content_hash(text: str, keywords, model: str) -> str:
+    """Changes whenever the embedded text, its keywords or the embedding model/dimension change"""
+    payload = json.dumps([text, keywords, model], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """Content hash of every record written to an index, stored in SQLite.
+
+    Rows are keyed on (scope, id), where scope identifies the backend and the
+    index(es) written to (MemoryAgent.manifest_scope). `source` is
+    the feed a record came from, so pruning one feed never deletes another's
+    records. `run` marks the last ingestion pass that saw the record.
+    """
+
+    def __init__(self, path: str = INDEX_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                scope TEXT NOT NULL,
+                id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                run TEXT NOT NULL,
+                PRIMARY KEY (scope, id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS manifest_source ON manifest (scope, source, run)")
+        self._conn.commit()
+
+    def hashes(self, scope: str, ids) -> dict:
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), 500): # Stay under SQLite's bound-parameter limit
+                batch = ids[start:start + 500]
+                found.update(self._conn.execute(
+                    f"SELECT id, hash FROM manifest WHERE scope = ? AND id IN ({','.join('?' * len(batch))})",
+                    [scope, *batch]
+                ).fetchall())
+        return found
+
+    def record(self, scope: str, source: str, run: str, items):
+        """Stores [(id, hash)] after they were written to the index"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)",
+                [(scope, vector_id, source, digest, run) for vector_id, digest in items]
+            )
+            self._conn.commit()
+
+    def touch(self, scope: str, source: str, run: str, ids):
+        """Marks unchanged records as seen by this run"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE manifest SET run = ?, source = ? WHERE scope = ? AND id = ?",
+                [(run, source, scope, vector_id) for vector_id in ids]
+            )
+            self._conn.commit()
+
+    def stale(self, scope: str, source: str, run: str):
+        """IDs from `source` that the (complete) run `run` did not see"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM manifest WHERE scope = ? AND source = ? AND run != ?", (scope, source, run)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def remove(self, scope: str, ids):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM manifest WHERE scope = ? AND id = ?", [(scope, vector_id) for vector_id in ids]
+            )
+            self._conn.commit()
+
+    def clear(self, scope: str) -> int:
+        """Forgets every record of a scope (its index was emptied or recreated)"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM manifest WHERE scope = ?", (scope,)).rowcount
+            self._conn.commit()
+        return deleted
@@ -1,13 +1,82 @@
 import os
 import time
+import random
+import asyncio
+import threading
 from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
+from pinecone import ServerlessSpec
 import google.generativeai as genai
+from agents.executor import run_blocking
+from agents.embedding_cache import EmbeddingCache
+from agents.vector_index import LocalVectorIndex, QueryResult, _as_record
+from agents.lexical_index import LexicalIndex, reciprocal_rank_fusion, file_signature
+from agents.keyword_table import KeywordTable
+from agents.keyword_ranking import aggregate_keywords, MAX_KEYWORDS
+from agents.index_migration import DualReadStats, top_k_overlap, iterate_records
+from agents.circuit_breaker import get_breaker, CircuitOpenError
+from agents.ledger import provider_call, timed_stage, estimate_tokens
+from agents.metrics import FALLBACKS
+from agents.pinecone_client import (
+    create_client, open_index, timeout_kwargs, PINECONE_QUERY_TIMEOUT, PINECONE_WRITE_TIMEOUT
+)
 
 load_dotenv()
 
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+EMBEDDING_TASK_TYPE = "retrieval_document"
+NATIVE_DIMENSION = 3072 # Full output size of EMBEDDING_MODEL
+EMBED_BATCH_LIMIT = 100 # Max texts per batchEmbedContents request
+
+MEMORY_INDEX_NAME = os.getenv("MEMORY_INDEX_NAME", "stylesync-index-v2")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", NATIVE_DIMENSION))
+
+# Dual-read while migrating to a smaller index (see migrate_index.py)
+SHADOW_INDEX_NAME = os.getenv("MEMORY_SHADOW_INDEX")
+SHADOW_DIMENSION = int(os.getenv("MEMORY_SHADOW_DIMENSION", 768))
+# Share of retrievals (keyword-table hits included) compared against the shadow index
+SHADOW_SAMPLE_RATE = float(os.getenv("MEMORY_SHADOW_SAMPLE_RATE", 0.1))
+
+# A lexical match covering this share of the query terms skips the embedding call (>1 disables)
+LEXICAL_SHORT_CIRCUIT_COVERAGE = float(os.getenv("LEXICAL_SHORT_CIRCUIT_COVERAGE", 1.0))
+DENSE_MIN_SCORE = 0.5 # Relevance threshold for vector matches
+DEFAULT_TOP_K = 5
+# Local indexes above this many vectors are searched on the "local" pool: an exact scan of
+# 50k x 3072 codes takes tens of milliseconds, which would stall every request on the loop
+LOCAL_QUERY_INLINE_MAX_ROWS = int(os.getenv("LOCAL_QUERY_INLINE_MAX_ROWS", 1000))
+
+CONNECT_RETRY_SECONDS = 30 # After a failed readiness check, wait this long before trying again
+
+# pinecone: Pinecone only | replica: Pinecone + local copy used for reads | local: local only
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "pinecone").lower()
+
 class MemoryAgent:
-    def __init__(self):
+    def __init__(self, persist_lexical: bool = True):
+        """The server passes persist_lexical=False: its workers only read the BM25 file,
+        which ingestion and the seeding scripts write (see reload_lexical_index)"""
+        # 0. Embedding cache (shared with the seeding scripts via SQLite)
+        self.embedding_cache = EmbeddingCache()
+        self.backend = MEMORY_BACKEND
+        self.local_index = LocalVectorIndex.load() if self.backend in ("replica", "local") else None
+        self.dimension = EMBEDDING_DIMENSION
+        self.dual_reads = DualReadStats()
+        self.persist_lexical = persist_lexical
+        self.lexical_index = LexicalIndex.load()
+        if len(self.lexical_index) == 0 and self.local_index is not None:
+            self.lexical_index.upsert(self.local_index.records())
+        self.retrieval_counters = {"lexical_only": 0, "hybrid": 0}
+        self.keyword_table = KeywordTable()
+        self.index_version = 0 # Bumped on every write; the keyword table rebuilds when it moves
+        self.pc = None
+        self.index_name = MEMORY_INDEX_NAME
+        self._index = None
+        self._connect_lock = threading.Lock()
+        self._connect_failed_at = 0.0
+        self._query_timeout = {}
+        self._write_timeout = {}
+        self._shadow_tasks = set()
+        self.embedding_breaker = get_breaker("embedding")
+        self.vector_query_breaker = get_breaker("vector_query")
+
         # 1. Configure Gemini (for Embeddings)
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
         if not self.gemini_api_key:
@@ -15,69 +84,461 @@ class MemoryAgent:
             return
         genai.configure(api_key=self.gemini_api_key)
         
+        if self.backend == "local":
+            print(f"🧠 Memory running on local index ({len(self.local_index)} vectors)")
+            return
+        
         # 2. Configure Pinecone (Vector DB)
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
         if not self.pinecone_api_key:
             print("⚠️ PINECONE_API_KEY missing. Memory Agent will fail.")
             return
             
-        self.pc = Pinecone(api_key=self.pinecone_api_key)
-        self.index_name = "stylesync-index-v2" # Rebranded Index Name
-        
-        # 3. Create Index if not exists
-        existing_indexes = [i.name for i in self.pc.list_indexes()]
-        if self.index_name not in existing_indexes:
-            print(f"🧠 Creating new memory index: {self.index_name}...")
+        # No network here: the index check runs once, in connect()/ready()
+        self.pc = create_client(self.pinecone_api_key)
+
+    # --- Pinecone readiness ---
+    @property
+    def index(self):
+        """Pinecone index handle; connects on first use (scripts), or at server startup via ready()"""
+        if self._index is None and self.pc is not None:
+            self.connect()
+        return self._index
+
+    def connect(self) -> bool:
+        """One-time readiness step: checks (or creates) the index and opens pooled handles.
+
+        The result is cached; a failure is retried at most every CONNECT_RETRY_SECONDS.
+        """
+        if self._index is not None or (self.local_index is not None and self.backend == "local"):
+            return True
+        if self.pc is None:
+            return False
+        with self._connect_lock:
+            if self._index is not None:
+                return True
+            if time.time() - self._connect_failed_at < CONNECT_RETRY_SECONDS:
+                return False
+            try:
+                index = self.ensure_index(self.index_name, self.dimension)
+                if SHADOW_INDEX_NAME:
+                    print(f"🔀 Dual-read enabled: comparing against {SHADOW_INDEX_NAME} ({SHADOW_DIMENSION} dims)")
+                    self.shadow_index = open_index(self.pc, SHADOW_INDEX_NAME)
+                self._query_timeout = timeout_kwargs(index, "query", PINECONE_QUERY_TIMEOUT)
+                self._write_timeout = timeout_kwargs(index, "upsert", PINECONE_WRITE_TIMEOUT)
+                self._index = index
+                print(f"✅ Memory connected to Pinecone index {self.index_name}")
+                return True
+            except Exception as e:
+                self._connect_failed_at = time.time()
+                print(f"❌ Pinecone readiness check failed: {e}")
+                return False
+
+    async def ready(self) -> bool:
+        """Async readiness: free once connected, otherwise runs connect() on the Pinecone pool"""
+        if self.is_ready():
+            return True
+        if self.pc is None:
+            return False
+        return await run_blocking("pinecone", self.connect)
+
+    def ensure_index(self, name, dimension):
+        """Returns a handle to a Pinecone index, creating it first if needed"""
+        existing_indexes = {i.name: getattr(i, "host", None) for i in self.pc.list_indexes()}
+        if name not in existing_indexes:
+            print(f"🧠 Creating new memory index: {name}...")
             try:
                 self.pc.create_index(
-                    name=self.index_name,
-                    dimension=3072, # Dimension for 'models/gemini-embedding-001'
+                    name=name,
+                    dimension=dimension,
                     metric='cosine',
                     spec=ServerlessSpec(cloud='aws', region='us-east-1')
                 )
-                while not self.pc.describe_index(self.index_name).status['ready']:
+                while not self.pc.describe_index(name).status['ready']:
                     time.sleep(1)
                 print("✅ Index created successfully.")
             except Exception as e:
                 print(f"❌ Failed to create index: {e}")
         
-        self.index = self.pc.Index(self.index_name)
+        return open_index(self.pc, name, existing_indexes.get(name))
 
-    def _get_embedding(self, text):
-        """Generates vector embeddings using Gemini"""
+    def manifest_scope(self) -> str:
+        """IndexManifest scope: the backend and every store an upsert writes to, so a
+        manifest kept for one backend or index is never trusted for another"""
+        parts = [self.backend]
+        if self.backend != "local":
+            parts.append(f"pinecone:{self.index_name}")
+        if self.local_index is not None:
+            parts.append(f"local:{os.path.abspath(self.local_index.path)}")
+        return "|".join(parts)
+
+    def record_count(self):
+        """Records in the emptiest store an upsert writes to; None if it cannot be counted"""
+        counts = []
+        if self.local_index is not None:
+            counts.append(len(self.local_index))
+        if self.backend != "local":
+            if self.index is None:
+                return None
+            stats = self.index.describe_index_stats()
+            counts.append(getattr(stats, "total_vector_count", None) or stats.get("total_vector_count", 0))
+        return min(counts) if counts else None
+
+    def embedding_model(self, dimension=None) -> str:
+        """Model identifier for caches and manifests; reduced-size embeddings are different vectors"""
+        dimension = dimension or self.dimension
+        return EMBEDDING_MODEL if dimension == NATIVE_DIMENSION else f"{EMBEDDING_MODEL}@{dimension}"
+
+    def _get_embedding(self, text, dimension=None):
+        """Generates vector embeddings using Gemini (cached per normalized text).
+
+        Returns None when Gemini fails or its breaker is open; callers skip the
+        vector query rather than searching with a meaningless zero vector.
+        """
+        dimension = dimension or self.dimension
+        cache_model = self.embedding_model(dimension)
+        cached = self.embedding_cache.get(cache_model, EMBEDDING_TASK_TYPE, text)
+        if cached is not None:
+            return cached
         try:
-            result = genai.embed_content(
-                model="models/gemini-embedding-001",
-                content=text,
-                task_type="retrieval_document"
-            )
-            return result['embedding']
+            kwargs = {}
+            if dimension != NATIVE_DIMENSION:
+                kwargs["output_dimensionality"] = dimension
+            with provider_call("embedding", EMBEDDING_MODEL, estimated=True) as call:
+                result = self.embedding_breaker.call(
+                    genai.embed_content,
+                    model=EMBEDDING_MODEL,
+                    content=text,
+                    task_type=EMBEDDING_TASK_TYPE,
+                    **kwargs
+                )
+                call.usage(estimate_tokens(text)) # The embedding API does not report usage
+            embedding = result['embedding']
+            self.embedding_cache.set(cache_model, EMBEDDING_TASK_TYPE, text, embedding)
+            return embedding
+        except CircuitOpenError:
+            return None
         except Exception as e:
             print(f"❌ Embedding Error: {e}")
-            return [0.0] * 3072 # Return empty vector on failure
+            return None
 
-    def retrieve_keywords(self, query_text: str, top_k=5):
-        """Searches memory for relevant keywords"""
-        if not hasattr(self, 'index'): return []
-        
+    def embed_batch(self, texts, dimension=None):
+        """Embeds many texts with one Gemini call per EMBED_BATCH_LIMIT misses.
+
+        Unlike _get_embedding this raises on failure, so bulk callers can retry
+        instead of writing zero vectors into the index.
+        """
+        dimension = dimension or self.dimension
+        cache_model = self.embedding_model(dimension)
+        embeddings = [self.embedding_cache.get(cache_model, EMBEDDING_TASK_TYPE, text) for text in texts]
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+
+        kwargs = {}
+        if dimension != NATIVE_DIMENSION:
+            kwargs["output_dimensionality"] = dimension
+        for start in range(0, len(missing), EMBED_BATCH_LIMIT):
+            rows = missing[start:start + EMBED_BATCH_LIMIT]
+            with provider_call("embedding", EMBEDDING_MODEL, estimated=True) as call:
+                result = self.embedding_breaker.call(
+                    genai.embed_content,
+                    model=EMBEDDING_MODEL,
+                    content=[texts[i] for i in rows],
+                    task_type=EMBEDDING_TASK_TYPE,
+                    **kwargs
+                )
+                call.usage(estimate_tokens([texts[i] for i in rows]))
+            for i, embedding in zip(rows, result['embedding']):
+                embeddings[i] = embedding
+                self.embedding_cache.set(cache_model, EMBEDDING_TASK_TYPE, texts[i], embedding)
+        return embeddings
+
+    def embed_query(self, text):
+        """Cached embedding of `text` for other agents (e.g. the writer's semantic cache); None on failure"""
+        return self._get_embedding(text)
+
+    def is_ready(self) -> bool:
+        """True once reads can be served; never does I/O"""
+        return self._index is not None or self.local_index is not None
+
+    def _use_local(self) -> bool:
+        """Serve reads from the local index when it is the backend or a populated replica"""
+        if self.local_index is None:
+            return False
+        return self.backend == "local" or len(self.local_index) > 0
+
+    def upsert(self, vectors, save=True):
+        """Writes vectors to Pinecone and keeps the local index in sync.
+
+        Bulk writers pass save=False and call flush() once per checkpoint, since
+        each save rewrites the whole local store.
+        """
+        if self.pc is not None and self.index is not None:
+            self.index.upsert(vectors=vectors, **self._write_timeout)
+        if self.local_index is not None:
+            self.local_index.upsert(vectors)
+        self.lexical_index.upsert((r[0], r[2]) for r in map(_as_record, vectors))
+        self.index_version += 1
+        if save:
+            self.flush()
+
+    def flush(self):
+        """Persists the local indexes (Pinecone writes are durable on return)"""
+        if self.local_index is not None:
+            self.local_index.save()
+        if self.persist_lexical:
+            self.lexical_index.save()
+
+    def delete(self, ids):
+        if self.pc is not None and self.index is not None:
+            self.index.delete(ids=ids, **self._write_timeout)
+        if self.local_index is not None:
+            self.local_index.delete(ids)
+        self.lexical_index.delete(ids)
+        self.index_version += 1
+        self.flush()
+
+    def sync_local_index(self, batch_size=100) -> int:
+        """Copies every vector from Pinecone into the local replica"""
+        if self.local_index is None or self.pc is None or self.index is None:
+            return 0
+        count = 0
+        for page in self.index.list():
+            # Older SDKs yield lists of IDs, newer ones ListResponse pages
+            ids = page if isinstance(page, list) else [v.id for v in page.vectors]
+            for start in range(0, len(ids), batch_size):
+                fetched = self.index.fetch(ids=ids[start:start + batch_size])
+                records = [
+                    {"id": vid, "values": vec.values, "metadata": vec.metadata or {}}
+                    for vid, vec in fetched.vectors.items()
+                ]
+                self.local_index.upsert(records)
+                self.lexical_index.upsert((r["id"], r["metadata"]) for r in records)
+                count += len(fetched.vectors)
+        self.index_version += 1
+        self.flush()
+        print(f"✅ Local index synced from Pinecone ({count} vectors)")
+        return count
+
+    def sync_lexical_index(self) -> int:
+        """Builds the keyword index from Pinecone metadata (Pinecone-only backend)"""
+        if self.pc is None or self.index is None:
+            return 0
+        count = 0
+        for page in iterate_records(self.index):
+            self.lexical_index.upsert(page)
+            count += len(page)
+        self.index_version += 1
+        if self.persist_lexical:
+            self.lexical_index.save()
+        print(f"✅ Lexical index built from Pinecone ({count} records)")
+        return count
+
+    def lexical_index_changed(self) -> bool:
+        """True when another process saved the BM25 file since this index was loaded or saved"""
+        signature = file_signature(self.lexical_index.path)
+        return signature is not None and signature != self.lexical_index.signature
+
+    def reload_lexical_index(self) -> bool:
+        """Swaps in the BM25 index saved by ingest_trends.py or a seeding script, so deleted
+        or changed trends stop being served by the lexical short-circuit"""
+        if not self.lexical_index_changed():
+            return False
+        self.lexical_index = LexicalIndex.load(self.lexical_index.path)
+        self.index_version += 1 # Rebuilds the keyword table and moves pipeline cache keys on
+        print(f"🔄 Lexical index reloaded ({len(self.lexical_index)} documents)")
+        return True
+
+    async def current_version(self):
+        """Index version for the keyword table loop; picks up a rewritten BM25 file first"""
+        if self.lexical_index_changed():
+            await run_blocking("local", self.reload_lexical_index)
+        return self.index_version
+
+    def _lexical_search(self, query_text, top_k):
+        """BM25 results, and whether they are confident enough to skip the embedding call"""
+        results, coverage = self.lexical_index.search(query_text, top_k)
+        confident = bool(results.matches) and coverage >= LEXICAL_SHORT_CIRCUIT_COVERAGE
+        self.retrieval_counters["lexical_only" if confident else "hybrid"] += 1
+        return results, confident
+
+    def _fuse(self, dense_results, lexical_results, top_k):
+        """Reciprocal-rank fusion of relevant vector matches and keyword matches"""
+        dense = QueryResult([m for m in dense_results.matches if m.score > DENSE_MIN_SCORE])
+        return reciprocal_rank_fusion([dense, lexical_results], top_k)
+
+    def retrieve_keywords(self, query_text: str, top_k=DEFAULT_TOP_K):
+        """Searches memory for relevant keywords, best first"""
+        return [keyword for keyword, _ in self.retrieve_scored_keywords(query_text, top_k)]
+
+    def retrieve_scored_keywords(self, query_text: str, top_k=DEFAULT_TOP_K):
+        """[(keyword, score)] from the precomputed table, or from a live search on a miss"""
+        if top_k == DEFAULT_TOP_K:
+            keywords = self.keyword_table.lookup(query_text)
+            if keywords is not None:
+                return keywords
+        keywords, complete = self._search_keywords(query_text, top_k)
+        if complete and top_k == DEFAULT_TOP_K:
+            self.keyword_table.remember(query_text, keywords)
+        elif not complete:
+            FALLBACKS.inc("retrieval") # Vector side unavailable: lexical keywords only
+        return keywords
+
+    def _search_keywords(self, query_text: str, top_k=DEFAULT_TOP_K):
+        """Live search: BM25 first, fused with vector search.
+
+        Returns (keywords, complete); complete is False when the vector side was
+        unavailable and only lexical results could be used.
+        """
         print(f"🧠 Searching memory for: '{query_text}'...")
+        lexical, confident = self._lexical_search(query_text, top_k)
+        if confident:
+            return self._extract_keywords(lexical, min_score=None), True
+        if not (self.is_ready() or self.connect()):
+            # Vector side down: keyword table misses still get BM25 results
+            return self._extract_keywords(lexical, min_score=None), False
         embedding = self._get_embedding(query_text)
+        if embedding is None:
+            return self._extract_keywords(lexical, min_score=None), False
+        
+        try:
+            if self._use_local():
+                with timed_stage("vector_query"):
+                    results = self.local_index.query(vector=embedding, top_k=top_k, include_metadata=True)
+            else:
+                index = self.index
+                with provider_call("vector_query", self.index_name):
+                    results = self.vector_query_breaker.call(
+                        index.query,
+                        vector=embedding,
+                        top_k=top_k,
+                        include_metadata=True,
+                        **self._query_timeout
+                    )
+            return self._extract_keywords(self._fuse(results, lexical, top_k), min_score=None), True
+        except Exception as e:
+            print(f"❌ Search Error: {e}")
+            return self._extract_keywords(lexical, min_score=None), False
+
+    async def retrieve_keywords_async(self, query_text: str, top_k=DEFAULT_TOP_K):
+        """Same as retrieve_keywords, but runs the Gemini and Pinecone calls on their own pools"""
+        return [keyword for keyword, _ in await self.retrieve_scored_keywords_async(query_text, top_k)]
+
+    async def retrieve_scored_keywords_async(self, query_text: str, top_k=DEFAULT_TOP_K):
+        self._sample_shadow(query_text, top_k)
+        if top_k == DEFAULT_TOP_K:
+            keywords = self.keyword_table.lookup(query_text)
+            if keywords is not None:
+                return keywords
+        keywords, complete = await self._search_keywords_async(query_text, top_k)
+        if complete and top_k == DEFAULT_TOP_K:
+            self.keyword_table.remember(query_text, keywords)
+        elif not complete:
+            FALLBACKS.inc("retrieval") # Vector side unavailable: lexical keywords only
+        return keywords
+
+    async def _search_keywords_async(self, query_text: str, top_k=DEFAULT_TOP_K):
+        print(f"🧠 Searching memory for: '{query_text}'...")
+        lexical, confident = self._lexical_search(query_text, top_k)
+        if confident:
+            # Every query term matched a stored trend: no Gemini round-trip needed
+            return self._extract_keywords(lexical, min_score=None), True
+        if not await self.ready():
+            return self._extract_keywords(lexical, min_score=None), False
+        embedding = await run_blocking("gemini", self._get_embedding, query_text)
+        if embedding is None:
+            return self._extract_keywords(lexical, min_score=None), False
         
         try:
-            results = self.index.query(
-                vector=embedding,
+            if self._use_local():
+                with timed_stage("vector_query"):
+                    results = await self._query_local_async(embedding, top_k)
+            else:
+                if self._index is None and not await run_blocking("pinecone", self.connect):
+                    raise RuntimeError("Pinecone index is not ready")
+                with provider_call("vector_query", self.index_name):
+                    results = await self.vector_query_breaker.call_async(
+                        run_blocking,
+                        "pinecone",
+                        self._index.query,
+                        vector=embedding,
+                        top_k=top_k,
+                        include_metadata=True,
+                        **self._query_timeout
+                    )
+            return self._extract_keywords(self._fuse(results, lexical, top_k), min_score=None), True
+        except Exception as e:
+            print(f"❌ Search Error: {e}")
+            return self._extract_keywords(lexical, min_score=None), False
+
+    async def _query_local_async(self, embedding, top_k, include_metadata=True):
+        """Local index query; small indexes stay on the loop, larger scans go to the "local" pool"""
+        if len(self.local_index) <= LOCAL_QUERY_INLINE_MAX_ROWS:
+            return self.local_index.query(vector=embedding, top_k=top_k, include_metadata=include_metadata)
+        return await run_blocking(
+            "local", self.local_index.query, vector=embedding, top_k=top_k, include_metadata=include_metadata
+        )
+
+    async def run_keyword_table(self):
+        """Background task: keeps the precomputed keyword table in step with the index"""
+        while not await self.ready():
+            if self.pc is None:
+                return # Nothing to serve keywords from
+            await asyncio.sleep(CONNECT_RETRY_SECONDS)
+        await self.keyword_table.run(
+            lambda query: self._search_keywords_async(query, DEFAULT_TOP_K),
+            self.current_version
+        )
+
+    def retrieval_stats(self) -> dict:
+        lookups = sum(self.retrieval_counters.values())
+        return {
+            **self.retrieval_counters,
+            "embedding_calls_saved_rate": round(self.retrieval_counters["lexical_only"] / lookups, 4) if lookups else 0.0,
+            "lexical_documents": len(self.lexical_index)
+        }
+
+    def _sample_shadow(self, query_text, top_k):
+        """Dual-read a sample of all retrievals. Sampling here rather than after a live
+        search keeps keyword-table and lexical hits, i.e. most traffic, in the comparison"""
+        if not hasattr(self, 'shadow_index') or random.random() >= SHADOW_SAMPLE_RATE:
+            return
+        task = asyncio.create_task(self._compare_shadow(query_text, top_k))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+
+    async def _compare_shadow(self, query_text, top_k):
+        """Queries the primary and the migration target off the request path and records overlap/latency"""
+        try:
+            primary_embedding = await run_blocking("gemini", self._get_embedding, query_text)
+            shadow_embedding = await run_blocking("gemini", self._get_embedding, query_text, SHADOW_DIMENSION)
+            if primary_embedding is None or shadow_embedding is None:
+                return
+            start = time.perf_counter()
+            if self._use_local():
+                primary_results = await self._query_local_async(primary_embedding, top_k, include_metadata=False)
+            else:
+                primary_results = await run_blocking(
+                    "pinecone", self._index.query, vector=primary_embedding, top_k=top_k,
+                    include_metadata=False, **self._query_timeout
+                )
+            primary_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            shadow_results = await run_blocking(
+                "pinecone",
+                self.shadow_index.query,
+                vector=shadow_embedding,
                 top_k=top_k,
-                include_metadata=True
+                include_metadata=False,
+                **self._query_timeout
+            )
+            shadow_ms = (time.perf_counter() - start) * 1000
+            self.dual_reads.record(
+                top_k_overlap([m.id for m in primary_results.matches], [m.id for m in shadow_results.matches]),
+                primary_ms, shadow_ms
             )
-            
-            # Extract unique keywords
-            keywords = []
-            for match in results.matches:
-                if match.score > 0.5: # Relevance threshold
-                    kw_str = match.metadata.get('keywords', '')
-                    keywords.extend([k.strip() for k in kw_str.split(',')])
-            
-            return list(set(keywords))[:10] # Return top 10 unique
         except Exception as e:
-            print(f"❌ Search Error: {e}")
-            return []
+            print(f"⚠️ Shadow read failed: {e}")
+
+    def _extract_keywords(self, results, min_score=DENSE_MIN_SCORE):
+        """Score-weighted, deduplicated top keywords from a (Pinecone, local or fused) query response"""
+        return aggregate_keywords(results.matches, MAX_KEYWORDS, min_score)
@@ -0,0 +1,163 @@
+import time
+import bisect
+import threading
+
+# Prometheus text exposition format 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4" # Starlette appends "; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRICS = []
+COLLECTORS = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value) # le is inclusive
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            values = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        lines = []
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def add_collector(collect):
+    """Registers `collect() -> [(kind, name, help, labelnames, [(label values, value)])]`,
+    called at scrape time so existing stats counters cost nothing per request"""
+    COLLECTORS.append(collect)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.header())
+        lines.extend(metric.render())
+    for collect in COLLECTORS:
+        try:
+            families = collect()
+        except Exception as e:
+            print(f"⚠️ Metrics collector failed: {e}")
+            continue
+        for kind, name, documentation, labelnames, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# outcome: ok, error, timeout or rejected (breaker open), so failures do not skew the ok latencies
+STAGE_LATENCY = Histogram(
+    "stylesync_stage_latency_seconds", "Provider call latency by pipeline stage and outcome", ["stage", "outcome"]
+)
+REQUEST_LATENCY = Histogram(
+    "stylesync_http_request_duration_seconds", "HTTP request latency, including streamed bodies", ["path"]
+)
+REQUESTS_IN_FLIGHT = Gauge("stylesync_requests_in_flight", "HTTP requests currently being served")
+REQUESTS_IN_FLIGHT.set(0)
+ERRORS = Counter("stylesync_errors_total", "Failed provider calls, pipeline runs and webhooks", ["stage"])
+FALLBACKS = Counter("stylesync_fallbacks_total", "Results served from a fallback instead of the provider", ["stage"])
+
+# Everything else is reported as "other" to keep label cardinality bounded (e.g. /jobs/{id})
+TRACKED_PATHS = {
+    "/generate-catalog", "/generate-catalog/stream", "/generate-catalog/batch", "/listing/draft",
+    "/jobs/generate-catalog", "/jobs/generate-catalog/batch", "/jobs/merch-batch", "/stats", "/metrics", "/"
+}
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: in-flight gauge and request latency (a few microseconds per request)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        label = path if path in TRACKED_PATHS else "other"
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.observe(time.perf_counter() - started, label)
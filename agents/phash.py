@@ -0,0 +1,167 @@
+import os
+import random
+import threading
+import itertools
+from collections import deque
+import PIL.Image
+
+DEFAULT_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", 6))
+DEFAULT_MAX_ENTRIES = int(os.getenv("PHASH_MAX_ENTRIES", 10000))
+DEFAULT_VERIFY_RATE = float(os.getenv("PHASH_VERIFY_RATE", 0.0))
+# Largest per-cell colour difference (0-255) between colour grids; dHash is grayscale,
+# so a navy and a red print of the same design only differ here
+DEFAULT_MAX_COLOR_DISTANCE = float(os.getenv("PHASH_MAX_COLOR_DISTANCE", 30))
+
+HASH_BITS = 64
+COLOR_GRID = 4
+
+# Fields that must agree for a reused analysis to count as a correct match
+VERIFY_FIELDS = ("main_color", "product_type", "design_style")
+
+
+def dhash(img, hash_size: int = 8) -> int:
+    """Difference hash: survives re-encoding, resizing and small crops"""
+    small = img.convert("L").resize((hash_size + 1, hash_size), PIL.Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def color_signature(img) -> bytes:
+    """Average RGB of a 4x4 grid; survives re-encoding and resizing but not recolouring"""
+    return img.convert("RGB").resize((COLOR_GRID, COLOR_GRID), PIL.Image.BOX).tobytes()
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def color_distance(a: bytes, b: bytes) -> float:
+    """Mean absolute RGB difference of the most different grid cell"""
+    return max(
+        (abs(a[i] - b[i]) + abs(a[i + 1] - b[i + 1]) + abs(a[i + 2] - b[i + 2])) / 3
+        for i in range(0, min(len(a), len(b)), 3)
+    )
+
+
+def _bands(max_distance: int, bits: int = HASH_BITS) -> list:
+    """(shift, mask) of max_distance + 1 disjoint bit ranges; by pigeonhole any hash
+    within max_distance bits matches at least one of them exactly"""
+    count = min(max(max_distance, 0) + 1, bits)
+    bands, start = [], 0
+    for i in range(count):
+        width = bits // count + (1 if i < bits % count else 0)
+        bands.append((start, (1 << width) - 1))
+        start += width
+    return bands
+
+
+def same_analysis(a: dict, b: dict) -> bool:
+    """True if two vision results describe the same product"""
+    return all(
+        str(a.get(k, "")).strip().lower() == str(b.get(k, "")).strip().lower()
+        for k in VERIFY_FIELDS
+    )
+
+
+class PerceptualIndex:
+    """Near-duplicate lookup of past vision results by dHash Hamming distance.
+
+    Hashes are bucketed on disjoint bit ranges (multi-index hashing), so a lookup
+    only compares against entries sharing a range instead of scanning them all.
+    A match must also be within `max_color_distance` on the colour signature.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 verify_rate: float = DEFAULT_VERIFY_RATE,
+                 max_color_distance: float = DEFAULT_MAX_COLOR_DISTANCE):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.verify_rate = verify_rate
+        self.max_color_distance = max_color_distance
+        self._bands = _bands(max_distance)
+        self._buckets = [{} for _ in self._bands]
+        self._entries = {} # id -> (hash, colour signature, result)
+        self._order = deque() # ids, oldest first
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.counters = {
+            "lookups": 0, "hits": 0, "misses": 0, "color_rejects": 0, "verified": 0, "false_matches": 0
+        }
+
+    def _keys(self, image_hash: int):
+        return [(image_hash >> shift) & mask for shift, mask in self._bands]
+
+    def lookup(self, image_hash: int, color: bytes = None):
+        """Returns (distance, result) for the closest entry within the threshold, else None"""
+        best_distance, best = self.max_distance + 1, None
+        color_rejected = False
+        with self._lock:
+            self.counters["lookups"] += 1
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._keys(image_hash)):
+                candidates.update(bucket.get(key, ()))
+            for entry_id in candidates:
+                candidate, candidate_color, result = self._entries[entry_id]
+                distance = hamming(image_hash, candidate)
+                if distance >= best_distance:
+                    continue
+                if color is not None and candidate_color is not None \
+                        and color_distance(color, candidate_color) > self.max_color_distance:
+                    color_rejected = True
+                    continue
+                best_distance, best = distance, result
+                if distance == 0:
+                    break
+            if best is None:
+                self.counters["misses"] += 1
+                if color_rejected:
+                    self.counters["color_rejects"] += 1
+                return None
+            self.counters["hits"] += 1
+            return best_distance, best
+
+    def add(self, image_hash: int, result: dict, color: bytes = None):
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (image_hash, color, result)
+            self._order.append(entry_id)
+            for bucket, key in zip(self._buckets, self._keys(image_hash)):
+                bucket.setdefault(key, set()).add(entry_id)
+            while len(self._order) > self.max_entries:
+                # Oldest entries go first
+                old_id = self._order.popleft()
+                old_hash = self._entries.pop(old_id)[0]
+                for bucket, key in zip(self._buckets, self._keys(old_hash)):
+                    ids = bucket[key]
+                    ids.discard(old_id)
+                    if not ids:
+                        del bucket[key]
+
+    def should_verify(self) -> bool:
+        """Sample a fraction of hits for re-analysis so false matches can be measured"""
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def record_verification(self, matched: bool):
+        with self._lock:
+            self.counters["verified"] += 1
+            if not matched:
+                self.counters["false_matches"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["lookups"]
+            verified = self.counters["verified"]
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "max_distance": self.max_distance,
+                "max_color_distance": self.max_color_distance,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                "false_match_rate": round(self.counters["false_matches"] / verified, 4) if verified else 0.0
+            }
@@ -0,0 +1,47 @@
+import os
+import inspect
+from pinecone import Pinecone
+from agents.executor import DEFAULT_WORKERS
+
+# One pooled keep-alive connection per "pinecone" executor thread by default
+PINECONE_POOL_SIZE = int(os.getenv("PINECONE_POOL_SIZE", os.getenv("PINECONE_MAX_WORKERS", DEFAULT_WORKERS["pinecone"])))
+PINECONE_QUERY_TIMEOUT = float(os.getenv("PINECONE_QUERY_TIMEOUT", 5))
+PINECONE_WRITE_TIMEOUT = float(os.getenv("PINECONE_WRITE_TIMEOUT", 30))
+
+
+def _accepts(fn, name: str) -> bool:
+    try:
+        return name in inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def create_client(api_key: str) -> Pinecone:
+    """Pinecone control-plane client with a connection pool sized to the executor.
+
+    The SDK's constructor arguments moved between major versions, so pool size
+    and default timeout are only passed where this SDK accepts them.
+    """
+    kwargs = {}
+    if _accepts(Pinecone.__init__, "connection_pool_maxsize"):
+        kwargs["connection_pool_maxsize"] = PINECONE_POOL_SIZE
+    else:
+        kwargs["pool_threads"] = PINECONE_POOL_SIZE
+    if _accepts(Pinecone.__init__, "timeout"):
+        kwargs["timeout"] = PINECONE_WRITE_TIMEOUT
+    return Pinecone(api_key=api_key, **kwargs)
+
+
+def open_index(pc: Pinecone, name: str, host: str = None):
+    """Data-plane handle; passing the host skips the describe call"""
+    if host:
+        return pc.Index(name=name, host=host, pool_threads=PINECONE_POOL_SIZE)
+    return pc.Index(name, pool_threads=PINECONE_POOL_SIZE)
+
+
+def timeout_kwargs(index, method: str, timeout: float) -> dict:
+    """{"timeout": ...} when the SDK supports per-call timeouts, else {} (client default applies).
+
+    Checked on the class: instance methods may be wrapped with a bare (*args, **kwargs) signature.
+    """
+    return {"timeout": timeout} if _accepts(getattr(type(index), method, None), "timeout") else {}
@@ -0,0 +1,190 @@
+import io
+import os
+import asyncio
+import zipfile
+from agents.cache import ResultCache, digest_bytes, make_key
+from agents.visual_analyst import PROMPT_VERSION as VISION_PROMPT_VERSION
+from agents.writer_agent import PROMPT_VERSION as WRITER_PROMPT_VERSION, WRITER_BATCH_SIZE, ListingBatcher
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+MAX_BATCH_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 64))
+MAX_BATCH_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 2000))
+# Uncompressed size limits for zip archives, checked before anything is inflated
+MAX_ZIP_FILE_BYTES = int(os.getenv("BATCH_ZIP_MAX_FILE_MB", 25)) * 1024 * 1024
+MAX_ZIP_TOTAL_BYTES = int(os.getenv("BATCH_ZIP_MAX_TOTAL_MB", 1024)) * 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_MB", 25)) * 1024 * 1024 # Per uploaded image (archives: MAX_ZIP_TOTAL_BYTES)
+STAGES = ("visual_analysis", "market_trends", "final_listing")
+
+
+class PipelineError(Exception):
+    """Raised when a catalog item cannot be processed"""
+
+
+def build_search_query(visual_data: dict) -> str:
+    """Create a memory search query from visual tags"""
+    return f"{visual_data.get('design_style', '')} {visual_data.get('product_type', '')}"
+
+
+def extract_zip_images(archive_bytes: bytes, max_items: int = MAX_BATCH_ITEMS):
+    """Returns [(name, bytes)] for every image inside a zip archive.
+
+    Raises PipelineError before inflating a member that would exceed the per-file
+    or total size limit, or once there are more than `max_items` images.
+    """
+    items, total = [], 0
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                continue
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if len(items) >= max_items:
+                raise PipelineError(f"Batch too large: archive has more than {max_items} images")
+            # file_size is the declared size; zipfile never inflates past it
+            if info.file_size > MAX_ZIP_FILE_BYTES:
+                raise PipelineError(f"{name} is too large ({info.file_size} bytes uncompressed)")
+            total += info.file_size
+            if total > MAX_ZIP_TOTAL_BYTES:
+                raise PipelineError(f"Archive too large (over {MAX_ZIP_TOTAL_BYTES} bytes uncompressed)")
+            items.append((name, archive.read(info)))
+    return items
+
+
+class CatalogPipeline:
+    """VisualAnalyst -> MemoryAgent -> WriterAgent, for one image or a whole batch"""
+
+    def __init__(self, visual_agent, memory_agent, writer_agent):
+        self.visual_agent = visual_agent
+        self.memory_agent = memory_agent
+        self.writer_agent = writer_agent
+        self.cache = ResultCache("pipeline")
+
+    def _cache_key(self, digest: str) -> str:
+        # Keywords depend on the trend index, so a write to it (or a rebuilt keyword table) misses
+        memory = self.memory_agent
+        keyword_table = getattr(memory, "keyword_table", None)
+        return make_key(
+            "pipeline", digest,
+            getattr(self.visual_agent, "model_name", ""), VISION_PROMPT_VERSION,
+            getattr(self.writer_agent, "model", ""), WRITER_PROMPT_VERSION,
+            getattr(memory, "backend", ""), getattr(memory, "index_name", ""),
+            getattr(memory, "index_version", ""), getattr(keyword_table, "version", "")
+        )
+
+    async def stream(self, image, filename: str = "upload", tokens: bool = False, write=None):
+        """Yields each stage's output as soon as it is ready: {"event": <stage>, "data": ...}
+
+        With tokens=True the listing is streamed too: a "draft_listing" event with
+        the writer's template draft comes first, then "listing_token" events carry
+        raw model output and "listing_field" events each completed field, before
+        the final_listing event. `write(visual_data, seo_keywords)` replaces
+        writer_agent.write_listing_async (run_batch passes a ListingBatcher).
+        """
+        digest = cache_key = None
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            digest = digest_bytes(image)
+            cache_key = self._cache_key(digest)
+            cached = await self.cache.get_async(cache_key)
+            if cached is not None:
+                print(f"⚡ Cache hit: {filename}")
+                for stage in STAGES:
+                    yield {"event": stage, "data": cached[stage], "cached": True}
+                return
+
+        # 1. Vision (The Eyes)
+        print(f"👁️ Analyzing: {filename}")
+        visual_data = await self.visual_agent.analyze_image(image, digest=digest)
+        yield {"event": "visual_analysis", "data": visual_data}
+
+        # 2. Memory (The Context)
+        search_query = build_search_query(visual_data)
+        print(f"🧠 Recalling trends for: {search_query}")
+        seo_keywords = await self.memory_agent.retrieve_keywords_async(search_query)
+        yield {"event": "market_trends", "data": seo_keywords}
+
+        # 3. Writer (The Brain)
+        print("✍️ Drafting copy...")
+        if tokens and hasattr(self.writer_agent, "draft_listing") and getattr(self.writer_agent, "backend", None) != "template":
+            # Shown while the LLM is still writing; final_listing replaces it
+            yield {"event": "draft_listing", "data": self.writer_agent.draft_listing(visual_data, seo_keywords)}
+        if tokens and hasattr(self.writer_agent, "stream_listing"):
+            async for update in self.writer_agent.stream_listing(visual_data, seo_keywords):
+                if update["type"] == "token":
+                    yield {"event": "listing_token", "data": update["text"]}
+                elif update["type"] == "field":
+                    yield {"event": "listing_field", "data": {"name": update["name"], "value": update["value"]}}
+                else:
+                    listing = update["data"]
+        else:
+            listing = await (write or self.writer_agent.write_listing_async)(visual_data, seo_keywords)
+        yield {"event": "final_listing", "data": listing}
+
+        # Only cache complete results; fallbacks carry an "error" key
+        if digest and "error" not in visual_data and "error" not in listing:
+            await self.cache.set_async(cache_key, {
+                "visual_analysis": visual_data,
+                "market_trends": seo_keywords,
+                "final_listing": listing
+            })
+
+    async def run(self, image, filename: str = "upload", write=None) -> dict:
+        result = {}
+        async for event in self.stream(image, filename, write=write):
+            result[event["event"]] = event["data"]
+        return result
+
+    async def _run_item(self, name: str, image, write=None):
+        result = await self.run(image, name, write=write)
+        if "error" in result["visual_analysis"]:
+            raise PipelineError(result["visual_analysis"]["error"])
+        return result
+
+    async def run_batch(self, items, concurrency: int = DEFAULT_BATCH_CONCURRENCY, progress=None) -> dict:
+        """Runs the pipeline for [(name, image)] with at most `concurrency` items in flight.
+
+        If given, progress(done, total) is called after every finished item.
+        """
+        if len(items) > MAX_BATCH_ITEMS:
+            raise PipelineError(f"Batch too large: {len(items)} items (max {MAX_BATCH_ITEMS})")
+        concurrency = max(1, min(concurrency, MAX_BATCH_CONCURRENCY))
+        semaphore = asyncio.Semaphore(concurrency)
+        finished = 0
+        # Several products per Groq completion; at most `concurrency` can be waiting at once
+        write = None
+        if WRITER_BATCH_SIZE > 1 and hasattr(self.writer_agent, "write_listings_async"):
+            write = ListingBatcher(self.writer_agent, size=min(WRITER_BATCH_SIZE, concurrency)).write
+
+        async def guarded(index, name, image):
+            nonlocal finished
+            async with semaphore:
+                try:
+                    outcome = index, name, await self._run_item(name, image, write), None
+                except Exception as e:
+                    print(f"❌ Batch item failed ({name}): {e}")
+                    outcome = index, name, None, str(e)
+            finished += 1
+            if progress:
+                progress(finished, len(items))
+            return outcome
+
+        print(f"📦 Processing batch of {len(items)} items (concurrency={concurrency})")
+        outcomes = await asyncio.gather(*[
+            guarded(i, name, image) for i, (name, image) in enumerate(items)
+        ])
+
+        results, failures = [], []
+        for index, name, result, error in outcomes:
+            if error is None:
+                results.append({"index": index, "filename": name, **result})
+            else:
+                failures.append({"index": index, "filename": name, "error": error})
+
+        return {
+            "total": len(items),
+            "succeeded": len(results),
+            "failed": len(failures),
+            "results": results,
+            "failures": failures
+        }
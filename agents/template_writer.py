@@ -0,0 +1,109 @@
+from agents.keyword_ranking import split_keywords
+
+TEMPLATE_MODEL = "template-v1" # Stands in for the Groq model name in cache keys
+
+# (low, high) USD by product type substring; first match wins
+PRICE_BANDS = (
+    ("jacket", (80, 150)), ("coat", (90, 180)), ("hoodie", (45, 75)), ("sweatshirt", (40, 65)),
+    ("sweater", (50, 90)), ("dress", (50, 110)), ("jeans", (50, 95)), ("pants", (40, 80)),
+    ("leggings", (30, 60)), ("shirt", (20, 40)), ("tee", (20, 40)), ("top", (20, 45)),
+    ("skirt", (35, 70)), ("shoe", (60, 130)), ("sneaker", (60, 130)), ("bag", (25, 60)),
+    ("hat", (20, 35)), ("cap", (20, 35)), ("mug", (12, 20)), ("poster", (15, 30)),
+)
+DEFAULT_PRICE_BAND = (30, 60)
+
+# Multipliers for styles that sell above or below the typical band
+STYLE_PRICE_FACTORS = {
+    "old money": 1.5, "luxury": 1.8, "quiet luxury": 1.8, "minimalist": 1.1, "vintage": 1.2,
+    "gorpcore": 1.3, "athleisure": 1.1, "y2k": 0.9, "streetwear": 1.0, "coquette": 1.0,
+}
+
+MAX_FEATURES = 3
+DESCRIPTION_KEYWORDS = 3
+
+
+def _text(value) -> str:
+    text = str(value or "").strip()
+    return "" if text.lower() in ("", "unknown", "n/a", "none") else text
+
+
+def _title_case(text: str) -> str:
+    return " ".join(word if word.isupper() else word[:1].upper() + word[1:] for word in text.split())
+
+
+def _round5(value: float) -> int:
+    return max(5, int(round(value / 5.0)) * 5)
+
+
+def price_band(product_type: str, design_style: str) -> str:
+    product_type, design_style = product_type.lower(), design_style.lower()
+    low, high = next((band for name, band in PRICE_BANDS if name in product_type), DEFAULT_PRICE_BAND)
+    factor = next((f for style, f in STYLE_PRICE_FACTORS.items() if style in design_style), 1.0)
+    return f"${_round5(low * factor)}-${_round5(high * factor)}"
+
+
+def rank_keywords(seo_keywords, visual_data: dict) -> list:
+    """Keywords deduplicated case-insensitively, in retrieval order, with those
+    that echo the product's own attributes moved to the front"""
+    attributes = " ".join(
+        str(visual_data.get(k, "")) for k in ("main_color", "product_type", "design_style")
+    ).lower()
+    unique = {}
+    for keyword in split_keywords(seo_keywords):
+        unique.setdefault(keyword.lower(), keyword)
+    unique = list(unique.values())
+    return sorted(unique, key=lambda k: not any(word in attributes for word in k.lower().split()))
+
+
+class TemplateWriter:
+    """Deterministic listing drafts from visual_data and retrieved keywords.
+
+    No provider call, so a draft costs well under a millisecond; the output has
+    the same keys as WriterAgent.write_listing.
+    """
+
+    model = TEMPLATE_MODEL
+
+    def write_listing(self, visual_data: dict, seo_keywords: list) -> dict:
+        color = _text(visual_data.get("main_color"))
+        product_type = _text(visual_data.get("product_type")) or "Product"
+        style = _text(visual_data.get("design_style"))
+        # The vision model sometimes returns a comma-separated string instead of a list
+        features = split_keywords(visual_data.get("visual_features"))
+        visual_features = [f for f in (_text(f) for f in features) if f and not f.startswith("Error")]
+        keywords = rank_keywords(seo_keywords, visual_data)
+
+        name = " ".join(part for part in (style, color, product_type) if part)
+        title_words = set(name.lower().split())
+        # Prefer a keyword that adds new words to the title over one that repeats it
+        accent = next((k for k in keywords if not set(k.lower().split()) & title_words), None)
+        accent = accent or next((k for k in keywords if not set(k.lower().split()) <= title_words), None)
+        title = _title_case(f"{name} | {accent}" if accent else name)
+
+        subject = " ".join(part for part in (color, product_type) if part).lower()
+        article = "An" if subject[:1] in "aeiou" else "A"
+        look = f"an {style.lower()}" if style[:1].lower() in "aeiou" else f"a {style.lower()}"
+        sentences = [f"{article} {subject} with {look} look." if style else f"{article} {subject} built for everyday wear."]
+        if visual_features:
+            details = visual_features[:2]
+            sentences.append(f"Features {' and '.join(d.lower() for d in details)}.")
+        if keywords:
+            picks = keywords[:DESCRIPTION_KEYWORDS]
+            joined = picks[0] if len(picks) == 1 else f"{', '.join(picks[:-1])} and {picks[-1]}"
+            sentences.append(f"Made for {joined.lower()} fans.")
+
+        features = [_title_case(f) for f in visual_features[:MAX_FEATURES]]
+        seen = {f.lower() for f in features}
+        for keyword in keywords:
+            if len(features) >= MAX_FEATURES:
+                break
+            if keyword.lower() not in seen:
+                features.append(_title_case(keyword))
+                seen.add(keyword.lower())
+
+        return {
+            "title": title,
+            "description": " ".join(sentences),
+            "features": features,
+            "price_estimate": price_band(product_type, style)
+        }
@@ -0,0 +1,261 @@
+import os
+import threading
+import numpy as np
+from agents.embedding_store import EmbeddingStore
+
+try:
+    import hnswlib
+except ImportError: # Optional: only needed for LOCAL_INDEX_MODE=hnsw
+    hnswlib = None
+
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", os.path.join("cache", "local_index"))
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact").lower()
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32").lower()
+
+
+class Match:
+    """Same shape as a Pinecone query match"""
+    __slots__ = ("id", "score", "metadata")
+
+    def __init__(self, id, score, metadata):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class QueryResult:
+    __slots__ = ("matches",)
+
+    def __init__(self, matches):
+        self.matches = matches
+
+
+def _as_record(vector):
+    """Accepts the same record shapes as Pinecone upsert: dicts or (id, values[, metadata]) tuples"""
+    if isinstance(vector, dict):
+        return vector["id"], vector["values"], vector.get("metadata") or {}
+    if isinstance(vector, (tuple, list)):
+        return vector[0], vector[1], (vector[2] if len(vector) > 2 else {}) or {}
+    return vector.id, vector.values, getattr(vector, "metadata", None) or {}
+
+
+class LocalVectorIndex:
+    """In-process cosine index: a NumPy matrix of unit vectors, optionally fronted by HNSW.
+
+    In exact mode a saved index is served straight from its memory-mapped
+    EmbeddingStore (the "base", possibly float16/int8); writes since the last
+    save live in an in-memory delta that shadows base records with the same id.
+    """
+
+    def __init__(self, dimension: int = None, mode: str = LOCAL_INDEX_MODE, path: str = LOCAL_INDEX_PATH,
+                 dtype: str = LOCAL_INDEX_DTYPE):
+        self.dimension = dimension
+        self.path = path
+        self.dtype = dtype
+        self.mode = mode
+        if mode == "hnsw" and hnswlib is None:
+            print("⚠️ hnswlib not installed, local index falls back to exact search")
+            self.mode = "exact"
+
+        self._vectors = np.zeros((0, dimension or 0), dtype=np.float32)
+        self._ids = []
+        self._metadata = []
+        self._rows = {} # id -> row
+        self._alive = np.zeros(0, dtype=bool)
+        self._free = []
+        self._hnsw = None
+        self._base = None
+        self._base_rows = {} # id -> row in the base store
+        self._shadowed = set() # base rows deleted or overwritten since the last save
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows) + len(self._base_rows) - len(self._shadowed)
+
+    # --- Writes ---
+    def upsert(self, vectors):
+        with self._lock:
+            for vector in vectors:
+                vector_id, values, metadata = _as_record(vector)
+                values = np.asarray(values, dtype=np.float32)
+                if self.dimension is None:
+                    self.dimension = values.shape[0]
+                    self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+                if values.shape[0] != self.dimension:
+                    raise ValueError(f"Vector {vector_id} has dimension {values.shape[0]}, expected {self.dimension}")
+                norm = np.linalg.norm(values)
+                if norm == 0:
+                    continue # A zero vector has no direction; it can never match anything
+
+                if vector_id in self._base_rows:
+                    self._shadowed.add(self._base_rows[vector_id])
+                row = self._rows.get(vector_id)
+                if row is None:
+                    row = self._free.pop() if self._free else self._grow()
+                    self._rows[vector_id] = row
+                self._vectors[row] = values / norm
+                self._ids[row] = vector_id
+                self._metadata[row] = dict(metadata)
+                self._alive[row] = True
+                if self._hnsw is not None:
+                    self._hnsw_add(row)
+
+    def delete(self, ids):
+        with self._lock:
+            for vector_id in ids:
+                if vector_id in self._base_rows:
+                    self._shadowed.add(self._base_rows[vector_id])
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                self._alive[row] = False
+                self._ids[row] = None
+                self._metadata[row] = None
+                self._free.append(row)
+                if self._hnsw is not None:
+                    self._hnsw.mark_deleted(row)
+
+    def _grow(self) -> int:
+        row = len(self._ids)
+        if row >= self._vectors.shape[0]:
+            capacity = max(16, self._vectors.shape[0] * 2)
+            vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+            vectors[:row] = self._vectors[:row]
+            self._vectors = vectors
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:row] = self._alive[:row]
+            self._alive = alive
+        self._ids.append(None)
+        self._metadata.append(None)
+        return row
+
+    # --- Reads ---
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True, **_):
+        with self._lock:
+            if len(self) == 0:
+                return QueryResult([])
+            q = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(q)
+            if norm == 0:
+                return QueryResult([])
+            q = q / norm
+
+            candidates = self._query_delta(q, top_k)
+            if self._base is not None:
+                rows, scores = self._base.search(q, top_k, exclude_rows=self._shadowed)
+                candidates.extend(
+                    (float(score), self._base.ids[row], self._base.metadata[row])
+                    for row, score in zip(rows, scores)
+                )
+            candidates.sort(key=lambda c: -c[0])
+
+            return QueryResult([
+                Match(vector_id, score, metadata if include_metadata else {})
+                for score, vector_id, metadata in candidates[:top_k]
+            ])
+
+    def _query_delta(self, q, top_k):
+        """Top-k over the in-memory rows as [(score, id, metadata)]"""
+        if not self._rows:
+            return []
+        top_k = min(top_k, len(self._rows))
+        if self.mode == "hnsw":
+            rows, scores = self._hnsw_query(q, top_k)
+        else:
+            used = len(self._ids)
+            scores_all = self._vectors[:used] @ q
+            scores_all[~self._alive[:used]] = -np.inf
+            if top_k < used:
+                rows = np.argpartition(-scores_all, top_k - 1)[:top_k]
+            else:
+                rows = np.arange(used)
+            rows = rows[np.argsort(-scores_all[rows], kind="stable")][:top_k]
+            scores = scores_all[rows]
+        return [(float(s), self._ids[r], self._metadata[r]) for r, s in zip(rows, scores) if self._alive[r]]
+
+    def items(self):
+        """Yields (id, unit vector, metadata) for every stored record"""
+        with self._lock:
+            if self._base is not None:
+                for vector_id, row in list(self._base_rows.items()):
+                    if row in self._shadowed:
+                        continue
+                    vector = self._base.dequantize([row])[0]
+                    yield vector_id, vector / self._base.norms[row], self._base.metadata[row]
+            for vector_id, row in list(self._rows.items()):
+                yield vector_id, self._vectors[row], self._metadata[row]
+
+    def records(self):
+        """Yields (id, metadata) for every stored record, without touching the vectors"""
+        with self._lock:
+            if self._base is not None:
+                for vector_id, row in list(self._base_rows.items()):
+                    if row not in self._shadowed:
+                        yield vector_id, self._base.metadata[row]
+            for vector_id, row in list(self._rows.items()):
+                yield vector_id, self._metadata[row]
+
+    # --- HNSW (optional) ---
+    def _build_hnsw(self):
+        capacity = max(1024, self._vectors.shape[0])
+        self._hnsw = hnswlib.Index(space="ip", dim=self.dimension) # unit vectors: ip == cosine
+        self._hnsw.init_index(max_elements=capacity, ef_construction=200, M=16)
+        self._hnsw.set_ef(64)
+        rows = np.flatnonzero(self._alive[:len(self._ids)])
+        if len(rows):
+            self._hnsw.add_items(self._vectors[rows], rows)
+
+    def _hnsw_add(self, row):
+        if row >= self._hnsw.get_max_elements():
+            self._hnsw.resize_index(max(row + 1, self._hnsw.get_max_elements() * 2))
+        self._hnsw.add_items(self._vectors[row:row + 1], [row])
+        try:
+            self._hnsw.unmark_deleted(row)
+        except RuntimeError:
+            pass # Row was not deleted
+
+    def _hnsw_query(self, q, top_k):
+        if self._hnsw is None:
+            self._build_hnsw()
+        self._hnsw.set_ef(max(64, top_k))
+        labels, distances = self._hnsw.knn_query(q, k=top_k)
+        return labels[0], 1.0 - distances[0]
+
+    # --- Persistence ---
+    def save(self, path: str = None):
+        """Compacts base + delta into a new EmbeddingStore version (quantized to self.dtype)"""
+        path = path or self.path
+        with self._lock:
+            records = list(self.items())
+            ids = [r[0] for r in records]
+            vectors = np.array([r[1] for r in records], dtype=np.float32).reshape(len(records), self.dimension or 0)
+            metadata = [r[2] for r in records]
+            store = EmbeddingStore.write(path, ids, vectors, metadata, dtype=self.dtype)
+            if self.mode != "hnsw" and path == self.path:
+                self._attach_base(store)
+
+    def _attach_base(self, store):
+        """Serve reads from `store` and drop the in-memory delta"""
+        self._base = store
+        self._base_rows = {vector_id: row for row, vector_id in enumerate(store.ids)}
+        self._shadowed = set()
+        self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        self._ids, self._metadata, self._rows = [], [], {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._free = []
+
+    @classmethod
+    def load(cls, path: str = LOCAL_INDEX_PATH, mode: str = LOCAL_INDEX_MODE, dtype: str = LOCAL_INDEX_DTYPE):
+        """Opens a saved index (memory-mapped), or returns an empty one if nothing is saved yet"""
+        index = cls(mode=mode, path=path, dtype=dtype)
+        if not EmbeddingStore.exists(path):
+            return index
+        store = EmbeddingStore.open(path)
+        index.dimension = store.dimension
+        index._vectors = np.zeros((0, index.dimension), dtype=np.float32)
+        if index.mode == "hnsw":
+            # HNSW needs every vector in memory to build its graph
+            index.upsert(zip(store.ids, store.dequantize(slice(None)), store.metadata))
+        else:
+            index._attach_base(store)
+        return index
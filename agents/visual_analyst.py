@@ -2,9 +2,19 @@ import os
 import json
 import google.generativeai as genai
 from dotenv import load_dotenv
+from agents.executor import run_blocking
+from agents.cache import ResultCache, digest_bytes, make_key
+from agents.image_prep import prepare_image
+from agents.phash import PerceptualIndex, dhash, color_signature, same_analysis
+from agents.circuit_breaker import get_breaker, CLOSED
+from agents.ledger import provider_call, gemini_usage
+from agents.metrics import FALLBACKS
 
 load_dotenv()
 
+# Bump whenever the vision prompt changes so cached analyses are not reused
+PROMPT_VERSION = "v1"
+
 class VisualAnalyst:
     def __init__(self):
         self.api_key = os.getenv("GEMINI_API_KEY")
@@ -14,46 +24,92 @@ class VisualAnalyst:
         genai.configure(api_key=self.api_key)
         self.model_name = "models/gemini-flash-latest"
         self.model = genai.GenerativeModel(self.model_name)
+        self.cache = ResultCache("vision")
+        self.near_duplicates = PerceptualIndex()
+        self.breaker = get_breaker("vision")
         print(f"✅ VisualAnalyst stored Gemini model: {self.model_name}")
 
-    async def analyze_image(self, image_path: str):
-        try:
-            # Upload the file to Gemini
-            # Note: For efficiency in production, files should be managed (uploads/deletes)
-            # but for this agentic flow, we'll upload per request or assume local path usage helper if needed.
-            # However, the standard `model.generate_content` can take PIL images or file objects directly for some sdk versions,
-            # but using the File API is cleaner for 1.5 Flash multi-modal.
-            # Let's use the simpler PIL integration if available, or just path if the SDK supports it.
-            # actually, standard genai usage for images usually involves PIL or uploading.
-            # Let's try the PIL approach first as it's often more direct for local scripts.
-            import PIL.Image
-            img = PIL.Image.open(image_path)
-            
-            user_prompt = (
-                "Analyze this product image. "
-                "Return ONLY valid JSON with keys: main_color, product_type, design_style, visual_features."
+    def _read_bytes(self, image):
+        """Returns the raw bytes of a path, bytes/memoryview or file-like object"""
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return image
+        if isinstance(image, (str, os.PathLike)):
+            with open(image, "rb") as f:
+                return f.read()
+        return image.read()
+
+    async def _call_model(self, jpeg_bytes: bytes) -> dict:
+        user_prompt = (
+            "Analyze this product image. "
+            "Return ONLY valid JSON with keys: main_color, product_type, design_style, visual_features."
+        )
+        
+        # Gemini 1.5 Flash supports JSON response schema, but simple prompting often works well too.
+        # We'll stick to prompt engineering for now to match the "Return ONLY valid JSON" instruction.
+        # generate_content is a blocking HTTP call, so it runs on the Gemini pool.
+        # While Gemini is failing the breaker rejects calls immediately (CircuitOpenError).
+        image_part = {"mime_type": "image/jpeg", "data": jpeg_bytes}
+        with provider_call("vision", self.model_name, PROMPT_VERSION) as call:
+            response = await self.breaker.call_async(
+                run_blocking, "gemini", self.model.generate_content, [user_prompt, image_part]
             )
+            call.usage(*gemini_usage(response))
+        
+        response_text = response.text
+        
+        # Clean up potential markdown code fences
+        cleaned_content = response_text
+        if "```json" in cleaned_content:
+            cleaned_content = cleaned_content.replace("```json", "").replace("```", "")
+        elif "```" in cleaned_content:
+             cleaned_content = cleaned_content.replace("```", "")
+        
+        return json.loads(cleaned_content.strip())
+
+    async def analyze_image(self, image, digest: str = None):
+        """Analyzes a product image given as a path, bytes, memoryview or file-like object.
+
+        Results are cached by image content; pass `digest` if the caller already hashed it.
+        Near-duplicates (re-encoded, resized, slightly cropped) reuse a past analysis.
+        """
+        try:
+            data = self._read_bytes(image)
+            cache_key = make_key("vision", digest or digest_bytes(data), self.model_name, PROMPT_VERSION)
+            cached = await self.cache.get_async(cache_key)
+            if cached is not None:
+                return cached
+
+            # Decode at reduced size, fix EXIF orientation and re-encode off the event loop
+            img, jpeg_bytes = await run_blocking("image", prepare_image, data)
+            image_hash, color = dhash(img), color_signature(img)
             
-            # Gemini 1.5 Flash supports JSON response schema, but simple prompting often works well too.
-            # We'll stick to prompt engineering for now to match the "Return ONLY valid JSON" instruction.
-            response = self.model.generate_content([user_prompt, img])
-            
-            response_text = response.text
-            
-            # Clean up potential markdown code fences
-            cleaned_content = response_text
-            if "```json" in cleaned_content:
-                cleaned_content = cleaned_content.replace("```json", "").replace("```", "")
-            elif "```" in cleaned_content:
-                 cleaned_content = cleaned_content.replace("```", "")
+            near = self.near_duplicates.lookup(image_hash, color)
+            if near is None:
+                result = await self._call_model(jpeg_bytes)
+                self.near_duplicates.add(image_hash, result, color)
+            else:
+                distance, result = near
+                if self.near_duplicates.should_verify() and self.breaker.state == CLOSED:
+                    # Re-run a sample of hits to measure the false-match rate
+                    fresh = await self._call_model(jpeg_bytes)
+                    matched = same_analysis(result, fresh)
+                    self.near_duplicates.record_verification(matched)
+                    if not matched:
+                        self.near_duplicates.add(image_hash, fresh, color)
+                    result = fresh
+                else:
+                    print(f"♻️ Near-duplicate image (distance {distance}), reusing analysis")
             
-            return json.loads(cleaned_content.strip())
+            await self.cache.set_async(cache_key, result)
+            return result
 
         except Exception as e:
             print(f"❌ Analysis Failed: {e}")
+            FALLBACKS.inc("vision")
             return {
                 "main_color": "Unknown",
                 "product_type": "Unknown", 
                 "design_style": "Unknown",
-                "visual_features": [f"Error: {str(e)}"]
+                "visual_features": [f"Error: {str(e)}"],
+                "error": str(e)
             }
@@ -1,21 +1,34 @@
 import os
 import json
+import asyncio
+import threading
 from groq import Groq
 from dotenv import load_dotenv
+from agents.executor import run_blocking, submit_blocking
+from agents.circuit_breaker import get_breaker, CircuitOpenError
+from agents.json_stream import JsonFieldParser, parse_json_text
+from agents.listing_cache import ListingCache, usage_tokens
+from agents.template_writer import TemplateWriter, TEMPLATE_MODEL
+from agents.ledger import provider_call, groq_usage
+from agents.metrics import FALLBACKS
 
 load_dotenv()
 
-class WriterAgent:
-    def __init__(self):
-        self.api_key = os.getenv("GROQ_API_KEY")
-        self.client = Groq(api_key=self.api_key) if self.api_key else None
-        self.model = "llama-3.3-70b-versatile"
+# Bump whenever a listing prompt changes so cached listings are not reused
+PROMPT_VERSION = "v2"
 
-    def write_listing(self, visual_data: dict, seo_keywords: list) -> dict:
-        if not self.client:
-            return {"error": "No API Key"}
+# "groq" (LLM listings) or "template" (local drafts only, no Groq calls)
+WRITER_BACKEND = os.getenv("WRITER_BACKEND", "groq").lower()
+
+# Products per Groq completion in write_listings; failed batches are split in half and retried
+WRITER_BATCH_SIZE = int(os.getenv("WRITER_BATCH_SIZE", 8))
+# How long ListingBatcher waits for more products before sending a partial batch
+WRITER_BATCH_LINGER_SECONDS = float(os.getenv("WRITER_BATCH_LINGER_SECONDS", 0.05))
+# Listing cache reads and writes may embed the input for the semantic tier. That is a
+# Gemini call, so it runs on the pool MemoryAgent.embed_query uses, not on a Groq slot.
+LISTING_CACHE_POOL = "gemini"
 
-        system_prompt = """You are a professional copywriter.
+SYSTEM_PROMPT = """You are a professional copywriter.
         Write a JSON product listing.
         
         RULES:
@@ -23,6 +36,7 @@ class WriterAgent:
         2. "description": Single paragraph, plain text, no newlines.
         3. "title": Concise SEO title.
         4. "features": List of 3 distinct features.
+        5. Write the keys in this order: title, description, features, price_estimate.
         
         Example Output:
         {
@@ -33,27 +47,381 @@ class WriterAgent:
         }
         """
 
+BATCH_SYSTEM_PROMPT = """You are a professional copywriter.
+        Write one JSON product listing for every product in the input.
+        
+        RULES:
+        1. Output strictly valid JSON: {"listings": [...]} with exactly one entry per input product.
+        2. "id": Copy the product's "id" unchanged.
+        3. "description": Single paragraph, plain text, no newlines.
+        4. "title": Concise SEO title.
+        5. "features": List of 3 distinct features.
+        
+        Example Output:
+        {
+            "listings": [
+                {
+                    "id": "1",
+                    "title": "Classic Leather Jacket",
+                    "description": "A timeless piece crafted from premium leather.",
+                    "features": ["Genuine Leather", "Slim Fit", "Zip Closure"],
+                    "price_estimate": "$100-$150"
+                }
+            ]
+        }
+        """
+
+_STREAM_END = object()
+
+
+def valid_listing(listing) -> bool:
+    return (
+        isinstance(listing, dict)
+        and isinstance(listing.get("title"), str) and listing["title"].strip() != ""
+        and isinstance(listing.get("description"), str)
+        and isinstance(listing.get("features"), list)
+    )
+
+
+def parse_batch(text: str, ids) -> dict:
+    """{id: listing} for the valid entries of a batched completion; raises ValueError if it is not JSON"""
+    data = json.loads(text)
+    entries = data.get("listings") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError('Batch output has no "listings" array')
+    listings = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        item_id = str(entry.get("id"))
+        listing = {k: v for k, v in entry.items() if k != "id"}
+        if item_id in ids and item_id not in listings and valid_listing(listing):
+            listings[item_id] = listing
+    return listings
+
+
+class WriterAgent:
+    def __init__(self, embed=None, backend: str = WRITER_BACKEND):
+        """`embed(text) -> vector | None` enables the semantic listing cache tier (see LISTING_SEMANTIC_THRESHOLD)"""
+        self.api_key = os.getenv("GROQ_API_KEY")
+        self.client = Groq(api_key=self.api_key) if self.api_key else None
+        self.backend = backend
+        self.template = TemplateWriter()
+        self.model = TEMPLATE_MODEL if backend == "template" else "llama-3.3-70b-versatile"
+        self.breaker = get_breaker("writer")
+        self.cache = ListingCache(embed=embed)
+
+    def draft_listing(self, visual_data: dict, seo_keywords: list) -> dict:
+        """Template listing in well under a millisecond, for previews until the LLM listing is ready"""
+        return self.template.write_listing(visual_data, seo_keywords)
+
+    def _call(self):
+        """Ledger entry for one Groq completion (see provider_call)"""
+        return provider_call("writer", self.model, PROMPT_VERSION)
+
+    def _cached(self, visual_data: dict, seo_keywords: list):
+        return self.cache.get(visual_data, seo_keywords, self.model, PROMPT_VERSION)
+
+    def _remember(self, visual_data: dict, seo_keywords: list, listing: dict, tokens: int):
+        # A fallback vision result would pin its placeholder listing to the key
+        if "error" not in visual_data and isinstance(listing, dict):
+            submit_blocking(LISTING_CACHE_POOL, self._store, visual_data, seo_keywords, listing, tokens)
+
+    def _store(self, visual_data: dict, seo_keywords: list, listing: dict, tokens: int):
+        try:
+            self.cache.set(visual_data, seo_keywords, self.model, PROMPT_VERSION, listing, tokens)
+        except Exception as e:
+            print(f"⚠️ Listing cache write failed: {e}")
+
+    def _messages(self, visual_data: dict, seo_keywords: list) -> list:
         user_content = f"""
         DATA: {json.dumps(visual_data)}
         KEYWORDS: {', '.join(seo_keywords)}
         """
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content}
+        ]
+
+    def _fallback(self, visual_data: dict, seo_keywords: list, error: Exception) -> dict:
+        """Template listing marked with the error; never cached"""
+        print(f"❌ Writer Error: {error}")
+        FALLBACKS.inc("writer")
+        return {**self.draft_listing(visual_data, seo_keywords), "error": str(error)}
+
+    def write_listing(self, visual_data: dict, seo_keywords: list) -> dict:
+        if self.backend == "template":
+            return self.draft_listing(visual_data, seo_keywords)
+        if not self.client:
+            return {"error": "No API Key"}
+
+        cached = self._cached(visual_data, seo_keywords)
+        if cached is not None:
+            return cached
+        return self._generate(visual_data, seo_keywords)
+
+    def _generate(self, visual_data: dict, seo_keywords: list) -> dict:
+        try:
+            with self._call() as call:
+                completion = self.breaker.call(
+                    self.client.chat.completions.create,
+                    model=self.model,
+                    messages=self._messages(visual_data, seo_keywords),
+                    temperature=0.1,
+                    response_format={"type": "json_object"}
+                )
+                call.usage(*groq_usage(getattr(completion, "usage", None)))
+            listing = json.loads(completion.choices[0].message.content)
+        except Exception as e:
+            return self._fallback(visual_data, seo_keywords, e)
+        self._remember(visual_data, seo_keywords, listing, usage_tokens(getattr(completion, "usage", None)))
+        return listing
+
+    async def write_listing_async(self, visual_data: dict, seo_keywords: list) -> dict:
+        """write_listing with the cache lookup on LISTING_CACHE_POOL and the completion on the Groq pool"""
+        if self.backend == "template":
+            return self.draft_listing(visual_data, seo_keywords)
+        if not self.client:
+            return {"error": "No API Key"}
+        cached = await run_blocking(LISTING_CACHE_POOL, self._cached, visual_data, seo_keywords)
+        if cached is not None:
+            return cached
+        return await run_blocking("groq", self._generate, visual_data, seo_keywords)
+
+    def _batch_messages(self, chunk: list) -> list:
+        products = [
+            {"id": item_id, "data": visual_data, "keywords": list(seo_keywords)}
+            for item_id, visual_data, seo_keywords in chunk
+        ]
+        return [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": f"PRODUCTS: {json.dumps(products)}"}
+        ]
+
+    def _write_chunk(self, chunk: list) -> dict:
+        """One completion for [(id, visual_data, seo_keywords)]. Products missing or
+        invalid in the output are retried in smaller batches, down to write_listing's
+        single-product prompt."""
+        if len(chunk) == 1:
+            item_id, visual_data, seo_keywords = chunk[0]
+            return {item_id: self._generate(visual_data, seo_keywords)}
+
+        try:
+            with self._call() as call:
+                completion = self.breaker.call(
+                    self.client.chat.completions.create,
+                    model=self.model,
+                    messages=self._batch_messages(chunk),
+                    temperature=0.1,
+                    response_format={"type": "json_object"}
+                )
+                call.usage(*groq_usage(getattr(completion, "usage", None)))
+            listings = parse_batch(completion.choices[0].message.content, {item_id for item_id, _, _ in chunk})
+        except CircuitOpenError as e:
+            return {item_id: self._fallback(visual_data, seo_keywords, e) for item_id, visual_data, seo_keywords in chunk}
+        except Exception as e:
+            print(f"⚠️ Writer batch of {len(chunk)} failed, splitting: {e}")
+            completion, listings = None, {}
+
+        tokens = usage_tokens(getattr(completion, "usage", None)) // max(1, len(listings))
+        for item_id, visual_data, seo_keywords in chunk:
+            if item_id in listings:
+                self._remember(visual_data, seo_keywords, listings[item_id], tokens)
+
+        rest = [item for item in chunk if item[0] not in listings]
+        if len(rest) == len(chunk):
+            middle = len(chunk) // 2
+            for half in (chunk[:middle], chunk[middle:]):
+                listings.update(self._write_chunk(half))
+        elif rest:
+            listings.update(self._write_chunk(rest))
+        return listings
+
+    def _split_cached(self, items: list, batch_size: int):
+        """({id: cached listing}, [chunks of uncached (id, visual_data, seo_keywords)])"""
+        results, pending = {}, []
+        for item_id, visual_data, seo_keywords in items:
+            cached = self._cached(visual_data, seo_keywords)
+            if cached is not None:
+                results[str(item_id)] = cached
+            else:
+                pending.append((str(item_id), visual_data, seo_keywords))
+        size = max(1, batch_size)
+        return results, [pending[i:i + size] for i in range(0, len(pending), size)]
+
+    def write_listings(self, items: list, batch_size: int = WRITER_BATCH_SIZE) -> dict:
+        """Listings for [(id, visual_data, seo_keywords)] with up to `batch_size`
+        products per Groq completion, so the instructions are sent once per batch
+        instead of once per product. Returns {id: listing} (ids as strings)."""
+        if self.backend == "template":
+            return {str(item_id): self.draft_listing(v, k) for item_id, v, k in items}
+        if not self.client:
+            return {str(item_id): {"error": "No API Key"} for item_id, _, _ in items}
+        results, chunks = self._split_cached(items, batch_size)
+        for chunk in chunks:
+            results.update(self._write_chunk(chunk))
+        return results
+
+    async def write_listings_async(self, items: list, batch_size: int = WRITER_BATCH_SIZE) -> dict:
+        """write_listings with the batches sent concurrently on the Groq pool"""
+        if self.backend == "template":
+            return self.write_listings(items, batch_size)
+        if not self.client:
+            return {str(item_id): {"error": "No API Key"} for item_id, _, _ in items}
+        results, chunks = await run_blocking(LISTING_CACHE_POOL, self._split_cached, items, batch_size)
+        for listings in await asyncio.gather(*[run_blocking("groq", self._write_chunk, chunk) for chunk in chunks]):
+            results.update(listings)
+        return results
+
+    def _stream_completion(self, messages: list, emit, stop: threading.Event) -> int:
+        """Runs on the Groq pool: pushes each content delta to emit() until the stream ends.
+
+        Returns the total tokens Groq reports in the last chunk (0 if it does not).
+        """
+        tokens = 0
+        with self._call() as call:
+            self.breaker.before_call()
+            try:
+                # Groq's JSON mode does not stream; the prompt asks for bare JSON instead
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.1,
+                    stream=True
+                )
+                for chunk in stream:
+                    if stop.is_set():
+                        stream.close() # Client went away: stop paying for tokens
+                        break
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        emit(text)
+                    usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None)
+                    if usage is not None:
+                        tokens = usage_tokens(usage)
+                        call.usage(*groq_usage(usage))
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+        return tokens
+
+    async def stream_listing(self, visual_data: dict, seo_keywords: list):
+        """Async generator over the listing as Groq writes it.
+
+        Yields {"type": "token", "text": ...} for every content delta,
+        {"type": "field", "name": ..., "value": ...} as each top-level field
+        (title, description, features, price_estimate) completes, and finally
+        {"type": "listing", "data": <same dict write_listing returns>}.
+        """
+        if self.backend == "template":
+            listing = self.draft_listing(visual_data, seo_keywords)
+            for name, value in listing.items():
+                yield {"type": "field", "name": name, "value": value}
+            yield {"type": "listing", "data": listing}
+            return
+        if not self.client:
+            yield {"type": "listing", "data": {"error": "No API Key"}}
+            return
+
+        cached = await run_blocking(LISTING_CACHE_POOL, self._cached, visual_data, seo_keywords)
+        if cached is not None:
+            for name, value in cached.items():
+                yield {"type": "field", "name": name, "value": value}
+            yield {"type": "listing", "data": cached}
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def emit(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        def produce():
+            try:
+                return self._stream_completion(self._messages(visual_data, seo_keywords), emit, stop)
+            except Exception as e:
+                emit(e)
+                return 0
+            finally:
+                emit(_STREAM_END)
+
+        producer = asyncio.ensure_future(run_blocking("groq", produce))
+        parser = JsonFieldParser()
+        chunks, error = [], None
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    error = item
+                    continue
+                chunks.append(item)
+                yield {"type": "token", "text": item}
+                for name, value in parser.feed(item):
+                    yield {"type": "field", "name": name, "value": value}
+        finally:
+            stop.set()
+        tokens = await producer
+
+        if error is None:
+            try:
+                listing = parse_json_text("".join(chunks))
+                self._remember(visual_data, seo_keywords, listing, tokens)
+            except ValueError as e:
+                error = e
+        if error is not None:
+            listing = self._fallback(visual_data, seo_keywords, error)
+        yield {"type": "listing", "data": listing}
+
+
+class ListingBatcher:
+    """Coalesces concurrent write_listing_async-style calls into write_listings_async batches.
+
+    A batch is sent once `size` products are waiting or `linger` seconds after
+    the first one arrived, whichever comes first.
+    """
+
+    def __init__(self, writer: WriterAgent, size: int = WRITER_BATCH_SIZE, linger: float = WRITER_BATCH_LINGER_SECONDS):
+        self.writer = writer
+        self.size = max(1, size)
+        self.linger = linger
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self._next_id = 0
+
+    async def write(self, visual_data: dict, seo_keywords: list) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._next_id += 1
+        self._pending.append((str(self._next_id), visual_data, seo_keywords, future))
+        if len(self._pending) >= self.size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
 
+    async def _send(self, batch: list):
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=0.1,
-                response_format={"type": "json_object"}
+            results = await self.writer.write_listings_async(
+                [(item_id, visual_data, seo_keywords) for item_id, visual_data, seo_keywords, _ in batch],
+                batch_size=self.size
             )
-            return json.loads(completion.choices[0].message.content)
         except Exception as e:
-            print(f"❌ Writer Error: {e}")
-            return {
-                "title": visual_data.get('product_type', 'Product Name'),
-                "description": "High-quality fashion item matching your style.",
-                "features": visual_data.get('visual_features', []),
-                "price_estimate": "$50-$100"
-            }
+            results = {item_id: self.writer._fallback(visual_data, seo_keywords, e) for item_id, visual_data, seo_keywords, _ in batch}
+        for item_id, visual_data, seo_keywords, future in batch:
+            if not future.done():
+                future.set_result(results.get(item_id) or self.writer._fallback(visual_data, seo_keywords, KeyError(item_id)))
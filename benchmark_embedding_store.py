@@ -0,0 +1,54 @@
+import sys
+import time
+import tempfile
+import numpy as np
+from agents.embedding_store import EmbeddingStore
+
+# Synthetic trend corpus shaped like gemini-embedding-001 output
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+DIMENSION = 3072
+QUERIES = 200
+TOP_K = 10
+
+def make_corpus(rng):
+    """Clustered vectors (styles x variations) so neighbours are meaningful"""
+    centers = rng.standard_normal((max(1, COUNT // 50), DIMENSION)).astype(np.float32)
+    labels = rng.integers(0, len(centers), COUNT)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((COUNT, DIMENSION)).astype(np.float32)
+    queries = vectors[rng.integers(0, COUNT, QUERIES)] + 0.3 * rng.standard_normal((QUERIES, DIMENSION)).astype(np.float32)
+    return vectors, queries
+
+def exact_top_k(vectors, queries):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = q @ unit.T
+    return [set(np.argsort(-row)[:TOP_K]) for row in scores]
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"🧪 {COUNT} vectors x {DIMENSION} dims, {QUERIES} queries, recall@{TOP_K} vs float32 exact")
+    vectors, queries = make_corpus(rng)
+    truth = exact_top_k(vectors, queries)
+    ids = [f"trend_{i}" for i in range(COUNT)]
+    metadata = [{}] * COUNT
+
+    print(f"{'dtype':<8} {'cached':>7} {'disk MB':>9} {'recall':>8} {'ms/query':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype, cached in (("float32", True), ("float16", False), ("float16", True), ("int8", False), ("int8", True)):
+            store = EmbeddingStore.write(f"{tmp}/{dtype}", ids, vectors, metadata, dtype=dtype)
+            # Uncached: convert chunk by chunk on every query (the default); cached: keep a float32 copy
+            store.dense_cache_bytes = store.count * store.dimension * 4 if cached else 0
+            store.search(queries[0], TOP_K) # Builds the float32 copy outside the timing
+
+            hits = 0
+            start = time.perf_counter()
+            for q, expected in zip(queries, truth):
+                rows, _ = store.search(q, TOP_K)
+                hits += len(expected.intersection(rows.tolist()))
+            elapsed = time.perf_counter() - start
+
+            recall = hits / (QUERIES * TOP_K)
+            print(f"{dtype:<8} {('yes' if cached else 'no') if dtype != 'float32' else '-':>7} {store.size_bytes() / 1e6:>9.1f} {recall:>8.4f} {elapsed / QUERIES * 1000:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import time
+import PIL.Image
+from dotenv import load_dotenv
+from agents.image_prep import prepare_image, VISION_MAX_DIM, VISION_JPEG_QUALITY
+
+load_dotenv()
+
+IMAGE_FILENAME = sys.argv[1] if len(sys.argv) > 1 else "test_image.jpg"
+RUNS = 5
+
+def time_it(fn, runs=RUNS):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+def decode_full(data):
+    img = PIL.Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+def sdk_blob(img):
+    """What the Gemini SDK sends for an in-memory PIL image: lossless WebP"""
+    buffer = io.BytesIO()
+    img.save(buffer, format="webp", lossless=True)
+    return buffer.getvalue()
+
+def main():
+    if not os.path.exists(IMAGE_FILENAME):
+        print(f"❌ {IMAGE_FILENAME} not found.")
+        sys.exit(1)
+
+    with open(IMAGE_FILENAME, "rb") as f:
+        data = f.read()
+
+    print(f"📸 {IMAGE_FILENAME}: {len(data)} bytes (max_dim={VISION_MAX_DIM}, quality={VISION_JPEG_QUALITY})")
+
+    # 1. Before: full-resolution decode, SDK re-encodes the whole image
+    before_decode, full_img = time_it(lambda: decode_full(data))
+    before_encode, before_blob = time_it(lambda: sdk_blob(full_img), runs=1)
+
+    # 2. After: draft decode + downscale + EXIF transpose + JPEG re-encode
+    after_total, (small_img, jpeg_bytes) = time_it(lambda: prepare_image(data))
+
+    print(f"{'':<8} {'size':>14} {'bytes sent':>12} {'prep ms':>10}")
+    print(f"{'before':<8} {str(full_img.size):>14} {len(before_blob):>12} {(before_decode + before_encode) * 1000:>10.1f}")
+    print(f"{'after':<8} {str(small_img.size):>14} {len(jpeg_bytes):>12} {after_total * 1000:>10.1f}")
+    print(f"📉 Bytes sent reduced by {100 * (1 - len(jpeg_bytes) / len(before_blob)):.1f}%")
+
+    # 3. End-to-end Gemini latency (optional, spends tokens)
+    if "--e2e" not in sys.argv:
+        print("\nRun with --e2e to also measure Gemini end-to-end latency.")
+        return
+
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    model = genai.GenerativeModel("models/gemini-flash-latest")
+    prompt = "Analyze this product image. Return ONLY valid JSON with keys: main_color, product_type, design_style, visual_features."
+
+    before_e2e, _ = time_it(lambda: model.generate_content([prompt, decode_full(data)]), runs=3)
+    after_e2e, _ = time_it(
+        lambda: model.generate_content([prompt, {"mime_type": "image/jpeg", "data": prepare_image(data)[1]}]),
+        runs=3
+    )
+    print(f"⏱️ End-to-end: before {before_e2e:.2f}s, after {after_e2e:.2f}s")
+
+if __name__ == "__main__":
+    main()
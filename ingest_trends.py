@@ -0,0 +1,54 @@
+import sys
+import asyncio
+import argparse
+from agents.memory_agent import MemoryAgent
+from agents.executor import shutdown_executors
+from agents.manifest import IndexManifest
+from agents.ingestion import (
+    ingest, IngestionError, DEFAULT_CHUNK_SIZE, DEFAULT_CONCURRENCY, DEFAULT_MAX_IN_FLIGHT
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load trend records (JSONL or CSV with id,text,keywords,...) into memory")
+    parser.add_argument("path", help="JSONL or CSV file of trend records")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Records per embedding batch and upsert")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Embedding batches running at once")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT, help="Chunks in flight at once")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first record")
+    parser.add_argument("--full", action="store_true", help="Re-embed every record, even if its content hash is unchanged (the manifest is still updated)")
+    parser.add_argument("--prune", action="store_true", help="Delete records previously ingested from this file that are no longer in it")
+    args = parser.parse_args()
+
+    agent = MemoryAgent()
+    if not (agent.is_ready() or agent.connect()):
+        print("❌ Memory Agent failed to initialize. Check API keys.")
+        sys.exit(1)
+
+    print(f"🚀 Ingesting {args.path} (chunks of {args.chunk_size}, concurrency {args.concurrency})")
+    try:
+        summary = asyncio.run(ingest(
+            agent, args.path,
+            checkpoint_path=args.checkpoint,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            max_in_flight=args.max_in_flight,
+            restart=args.restart,
+            manifest=IndexManifest(),
+            prune=args.prune,
+            full=args.full
+        ))
+    except IngestionError as e:
+        print(f"❌ {e}. Re-run the same command to resume.")
+        sys.exit(1)
+    finally:
+        shutdown_executors()
+
+    print(f"✅ Ingested {summary['ingested']} records in {summary['elapsed_seconds']}s "
+          f"({summary['items_per_second']} items/s), {summary['unchanged']} unchanged, "
+          f"{summary['deleted']} deleted, skipped {summary['skipped']} without text")
+
+
+if __name__ == "__main__":
+    main()
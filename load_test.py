@@ -0,0 +1,95 @@
+import io
+import os
+import sys
+import time
+import random
+import asyncio
+import httpx
+from PIL import Image
+
+IMAGE_FILENAME = os.getenv("LOAD_TEST_IMAGE", "test_image.jpg")
+URL = os.getenv("LOAD_TEST_URL", "http://localhost:7860/generate-catalog")
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+REQUESTS_PER_WORKER = 3
+# unique: every request sends a different image, so the result caches and the
+# near-duplicate index miss and provider throughput is measured; same: cache hits
+PAYLOAD_MODE = os.getenv("LOAD_TEST_PAYLOAD", "unique").lower()
+
+def make_payload(image_bytes, seed):
+    """Blends the image with a random block pattern, which moves its dHash and content digest"""
+    if PAYLOAD_MODE == "same":
+        return image_bytes
+    rng = random.Random(seed)
+    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    blocks = Image.frombytes("L", (9, 8), bytes(rng.randrange(256) for _ in range(72)))
+    pattern = blocks.resize(img.size, Image.NEAREST).convert("RGB")
+    buffer = io.BytesIO()
+    Image.blend(img, pattern, 0.4).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+async def worker(client, payloads, latencies, errors):
+    for payload in payloads:
+        files = {"file": (IMAGE_FILENAME, payload, "image/jpeg")}
+        start = time.perf_counter()
+        try:
+            response = await client.post(URL, files=files)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+
+async def run_level(concurrency, image_bytes, seeds):
+    latencies, errors = [], []
+    # Encoded up front so image work does not run on the loop while requests are timed
+    payloads = [
+        [make_payload(image_bytes, next(seeds)) for _ in range(REQUESTS_PER_WORKER)]
+        for _ in range(concurrency)
+    ]
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, worker_payloads, latencies, errors) for worker_payloads in payloads
+        ])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed,
+        "p50": p50,
+        "p95": p95,
+    }
+
+async def main():
+    if not os.path.exists(IMAGE_FILENAME):
+        print(f"❌ {IMAGE_FILENAME} not found.")
+        sys.exit(1)
+
+    with open(IMAGE_FILENAME, "rb") as f:
+        image_bytes = f.read()
+
+    print(f"🚀 Load testing {URL} with {IMAGE_FILENAME} ({PAYLOAD_MODE} payloads)")
+    print(f"{'conc':>5} {'reqs':>5} {'errs':>5} {'req/s':>8} {'speedup':>8} {'p50 s':>7} {'p95 s':>7}")
+
+    baseline = None
+    seeds = iter(range(random.randrange(1 << 30), 1 << 31)) # Fresh images on every run
+    for concurrency in CONCURRENCY_LEVELS:
+        result = await run_level(concurrency, image_bytes, seeds)
+        if baseline is None:
+            baseline = result["throughput"]
+        speedup = result["throughput"] / baseline if baseline else 0.0
+        print(
+            f"{result['concurrency']:>5} {result['requests']:>5} {result['errors']:>5} "
+            f"{result['throughput']:>8.2f} {speedup:>7.1f}x {result['p50']:>7.2f} {result['p95']:>7.2f}"
+        )
+
+    print("\nThroughput should scale ~linearly with concurrency until a provider rate limit "
+          "or the *_MAX_WORKERS pool size is reached.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,28 +1,117 @@
 import os
+import json
 import httpx
 import asyncio
+import zipfile
+from typing import List, Optional
 from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import HTMLResponse, JSONResponse
+from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.requests import Request
 from dotenv import load_dotenv
 
 # Import Phase 2 & 3 Agents
 from agents.visual_analyst import VisualAnalyst
 from agents.memory_agent import MemoryAgent
 from agents.writer_agent import WriterAgent
+from agents.template_writer import TemplateWriter
+from agents.executor import run_blocking, shutdown_executors
+from agents.pipeline import (
+    CatalogPipeline, PipelineError, DEFAULT_BATCH_CONCURRENCY, MAX_BATCH_ITEMS, MAX_UPLOAD_BYTES,
+    MAX_ZIP_TOTAL_BYTES, STAGES, extract_zip_images
+)
+from agents.jobs import JobManager, JobQueueFull
+from agents.cache import cache_stats
+from agents.circuit_breaker import breaker_stats
+from agents.ledger import request_ledger, timed_stage, USAGE
+from agents.metrics import (
+    MetricsMiddleware, ERRORS, CONTENT_TYPE, add_collector, render_metrics
+)
 
 load_dotenv()
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+BATCH_MAX_FIELDS = 16 # Non-file fields in a batch form (only `concurrency` is read)
 
 # --- Global Agent Initialization ---
 print("🚀 StyleSync AI: Initializing Agents...")
-try:
-    visual_agent = VisualAnalyst()
-    memory_agent = MemoryAgent() # Connects to 'stylesync-index-v2'
-    writer_agent = WriterAgent()
+# Each agent starts on its own, so one missing provider key leaves the others (and
+# /stats, /metrics, /listing/draft, the job queue) serving; pipeline endpoints answer 503
+def _init(name, factory):
+    try:
+        return factory()
+    except Exception as e:
+        print(f"❌ {name} failed to start: {e}")
+        return None
+
+visual_agent = _init("Visual Analyst", VisualAnalyst)
+memory_agent = _init("Memory Agent", lambda: MemoryAgent(persist_lexical=False)) # Connects to 'stylesync-index-v2'
+# The embedder is used only if LISTING_SEMANTIC_THRESHOLD is set
+writer_agent = _init("Writer Agent", lambda: WriterAgent(embed=memory_agent.embed_query if memory_agent else None))
+pipeline = None
+if visual_agent and memory_agent and writer_agent:
+    pipeline = _init("Catalog Pipeline", lambda: CatalogPipeline(visual_agent, memory_agent, writer_agent))
+if pipeline is not None:
     print("✅ All Agents Online & Ready.")
-except Exception as e:
-    print(f"❌ Critical Startup Error: {e}")
+else:
+    print("⚠️ Running in degraded mode: catalog endpoints will return 503")
+
+job_manager = _init("Job Manager", JobManager)
+template_writer = TemplateWriter() # No provider key needed, so drafts work even in degraded mode
+merch_manager = None
+
+keyword_table_task = None
+
+@app.on_event("startup")
+async def startup():
+    global keyword_table_task
+    if job_manager is not None:
+        job_manager.start()
+    if memory_agent is None:
+        return # Degraded mode: nothing to precompute or warm up
+    # Precompute keywords for the style x type query space off the request path
+    keyword_table_task = asyncio.create_task(memory_agent.run_keyword_table())
+    # Pinecone index check/creation runs once here, off the import and request paths
+    asyncio.create_task(warm_up_memory())
+
+async def warm_up_memory():
+    if not await memory_agent.ready():
+        return
+    if memory_agent.backend == "replica":
+        # Refresh the local copy in the background; reads use it as soon as it has data
+        await sync_memory_replica()
+    elif memory_agent.backend == "pinecone" and len(memory_agent.lexical_index) == 0:
+        # Keyword search is local; build it from Pinecone metadata the first time
+        await sync_lexical_index()
+
+async def sync_memory_replica():
+    try:
+        await run_blocking("pinecone", memory_agent.sync_local_index)
+    except Exception as e:
+        print(f"⚠️ Local index sync failed: {e}")
+
+async def sync_lexical_index():
+    try:
+        await run_blocking("pinecone", memory_agent.sync_lexical_index)
+    except Exception as e:
+        print(f"⚠️ Lexical index build failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown():
+    if keyword_table_task:
+        keyword_table_task.cancel()
+    if job_manager is not None:
+        await job_manager.stop()
+    shutdown_executors()
+
+def unavailable(component: str):
+    """503 for endpoints whose agents failed to start (see the startup log for the cause)"""
+    return JSONResponse(
+        content={"error": f"{component} is unavailable: agent initialization failed, check the provider keys"},
+        status_code=503
+    )
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -33,57 +122,297 @@ async def read_root():
         return "<h1>Error: dashboard.html not found. Run setup scripts first.</h1>"
 
 @app.post("/generate-catalog")
-async def generate_catalog(file: UploadFile = File(...)):
-    file_path = f"temp_{file.filename}"
+async def generate_catalog(file: UploadFile = File(...), usage: bool = False):
+    if pipeline is None:
+        return unavailable("Catalog pipeline")
     try:
-        # 1. Save File Temporarily
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        
-        # 2. Vision (The Eyes)
-        print(f"👁️ Analyzing: {file.filename}")
-        visual_data = await visual_agent.analyze_image(file_path)
+        # 1. Read upload into memory (no temp files, no name clashes between requests)
+        image_bytes = await read_upload(file)
         
-        # 3. Memory (The Context)
-        # Create a search query from visual tags
-        search_query = f"{visual_data.get('design_style', '')} {visual_data.get('product_type', '')}"
-        print(f"🧠 Recalling trends for: {search_query}")
-        seo_keywords = memory_agent.retrieve_keywords(search_query)
+        # 2. Vision -> Memory -> Writer
+        with request_ledger() as ledger:
+            result = await pipeline.run(image_bytes, file.filename)
         
-        # 4. Writer (The Brain)
-        print("✍️ Drafting copy...")
-        listing = writer_agent.write_listing(visual_data, seo_keywords)
+        # 3. Construct Payload
+        response_data = {"status": "success", **result}
+        if usage:
+            response_data["usage"] = ledger.summary()
         
-        # 5. Construct Payload
-        response_data = {
-            "status": "success",
-            "visual_analysis": visual_data,
-            "market_trends": seo_keywords,
-            "final_listing": listing
-        }
-        
-        # 6. Automation Trigger (n8n)
-        n8n_url = os.getenv("N8N_WEBHOOK_URL")
-        if n8n_url:
-            asyncio.create_task(trigger_webhook(n8n_url, response_data))
+        # 4. Automation Trigger (n8n)
+        notify_n8n(response_data)
             
         return JSONResponse(content=response_data)
 
+    except PipelineError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
         print(f"❌ Pipeline Error: {e}")
+        ERRORS.inc("pipeline")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.post("/generate-catalog/stream")
+async def generate_catalog_stream(file: UploadFile = File(...), usage: bool = False):
+    """Same pipeline as /generate-catalog, streamed as NDJSON: one line per finished stage,
+    plus listing tokens and fields while the writer is still generating"""
+    if pipeline is None:
+        return unavailable("Catalog pipeline")
+    try:
+        image_bytes = await read_upload(file)
+    except PipelineError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    async def event_stream():
+        response_data = {"status": "success"}
+        try:
+            with request_ledger() as ledger:
+                async for event in pipeline.stream(image_bytes, file.filename, tokens=True):
+                    if event["event"] in STAGES:
+                        response_data[event["event"]] = event["data"]
+                    yield json.dumps(event) + "\n"
+            if usage:
+                response_data["usage"] = ledger.summary()
+                yield json.dumps({"event": "usage", "data": response_data["usage"]}) + "\n"
+            yield json.dumps({"event": "done", "data": {"status": "success"}}) + "\n"
+        except Exception as e:
+            print(f"❌ Pipeline Error: {e}")
+            ERRORS.inc("pipeline")
+            yield json.dumps({"event": "error", "data": {"error": str(e)}}) + "\n"
+            return
+
+        notify_n8n(response_data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class ListingDraftRequest(BaseModel):
+    visual_data: dict
+    keywords: List[str] = []
+
+@app.post("/listing/draft")
+async def listing_draft(request: ListingDraftRequest):
+    """Template listing for live previews; no provider calls, so it returns in well under 50 ms"""
+    return template_writer.write_listing(request.visual_data, request.keywords)
+
+@app.post("/generate-catalog/batch")
+async def generate_catalog_batch(request: Request, usage: bool = False):
+    """Runs the full pipeline for many images (multiple `files` and/or a zip `archive`,
+    plus an optional `concurrency` form field)"""
+    if pipeline is None:
+        return unavailable("Catalog pipeline")
+    try:
+        items, concurrency = await read_batch_form(request)
+        if not items:
+            return JSONResponse(content={"error": "No images provided"}, status_code=400)
+
+        with request_ledger() as ledger:
+            batch = await pipeline.run_batch(items, concurrency=concurrency)
+        response_data = {"status": "success", **batch}
+        if usage:
+            response_data["usage"] = ledger.summary()
+
+        notify_n8n(response_data)
+
+        return JSONResponse(content=response_data)
+
+    except (PipelineError, zipfile.BadZipFile) as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"❌ Batch Pipeline Error: {e}")
+        ERRORS.inc("pipeline")
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/stats")
+async def stats():
+    """Cache hit/miss, retrieval, breaker and token usage counters (agents that failed to start are null)"""
+    return {
+        "cache": cache_stats(),
+        "near_duplicates": visual_agent.near_duplicates.stats() if visual_agent else None,
+        "embeddings": memory_agent.embedding_cache.stats() if memory_agent else None,
+        "dual_read": memory_agent.dual_reads.stats() if memory_agent else None,
+        "retrieval": memory_agent.retrieval_stats() if memory_agent else None,
+        "keyword_table": memory_agent.keyword_table.stats() if memory_agent else None,
+        "listings": writer_agent.cache.stats() if writer_agent else None,
+        "circuit_breakers": breaker_stats(),
+        "usage": USAGE.stats()
+    }
+
+def collect_metrics():
+    """Scrape-time view of the counters the agents already keep (no per-request cost)"""
+    caches = {name: (s["hits"], s["misses"]) for name, s in cache_stats().items()}
+    if memory_agent is not None:
+        embeddings = memory_agent.embedding_cache.stats()
+        caches["embeddings"] = (embeddings["memory_hits"] + embeddings["disk_hits"], embeddings["misses"])
+        table = memory_agent.keyword_table.stats()
+        caches["keyword_table"] = (table["hits"], table["misses"])
+    if visual_agent is not None:
+        near = visual_agent.near_duplicates.stats()
+        caches["near_duplicates"] = (near["hits"], near["misses"])
+    if writer_agent is not None:
+        listings = writer_agent.cache.stats()
+        caches["listings_semantic"] = (listings["semantic_hits"], listings["misses"])
+    breakers = breaker_stats()
+    return [
+        ("counter", "stylesync_cache_hits_total", "Cache hits by cache", ("cache",),
+         [((name,), hits) for name, (hits, _) in caches.items()]),
+        ("counter", "stylesync_cache_misses_total", "Cache misses by cache", ("cache",),
+         [((name,), misses) for name, (_, misses) in caches.items()]),
+        ("gauge", "stylesync_job_queue_depth", "Background jobs waiting for a worker", (),
+         [((), job_manager.queue_depth if job_manager else 0)]),
+        ("gauge", "stylesync_circuit_breaker_state", "0 closed, 1 half-open, 2 open", ("breaker",),
+         [((name,), b["state_value"]) for name, b in breakers.items()]),
+    ]
+
+add_collector(collect_metrics)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of latency histograms, counters and gauges"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+# --- Background Jobs ---
+class MerchBatchRequest(BaseModel):
+    niche: str
+
+@app.post("/jobs/generate-catalog")
+async def submit_catalog_job(file: UploadFile = File(...)):
+    """Queues a single-image catalog job and returns its ID immediately"""
+    if pipeline is None or job_manager is None:
+        return unavailable("Catalog pipeline" if pipeline is None else "Job queue")
+    try:
+        image_bytes = await read_upload(file)
+    except PipelineError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    filename = file.filename
+
+    async def work(progress):
+        result = await pipeline.run(image_bytes, filename)
+        response_data = {"status": "success", **result}
+        notify_n8n(response_data)
+        return response_data
+
+    return queue_job("generate-catalog", work)
+
+@app.post("/jobs/generate-catalog/batch")
+async def submit_catalog_batch_job(request: Request):
+    """Queues a batch catalog job (same form as /generate-catalog/batch); poll /jobs/{id} for progress and results"""
+    if pipeline is None or job_manager is None:
+        return unavailable("Catalog pipeline" if pipeline is None else "Job queue")
+    try:
+        items, concurrency = await read_batch_form(request)
+    except (PipelineError, zipfile.BadZipFile) as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    if not items:
+        return JSONResponse(content={"error": "No images provided"}, status_code=400)
+    if len(items) > MAX_BATCH_ITEMS:
+        return JSONResponse(content={"error": f"Batch too large: {len(items)} items (max {MAX_BATCH_ITEMS})"}, status_code=400)
+
+    async def work(progress):
+        batch = await pipeline.run_batch(items, concurrency=concurrency, progress=progress)
+        response_data = {"status": "success", **batch}
+        notify_n8n(response_data)
+        return response_data
+
+    return queue_job("generate-catalog-batch", work, total=len(items))
+
+@app.post("/jobs/merch-batch")
+async def submit_merch_batch_job(request: MerchBatchRequest):
+    """Queues MerchManager.generate_batch for a niche"""
+    global merch_manager
+    if job_manager is None:
+        return unavailable("Job queue")
+    if merch_manager is None:
+        from agents.manager import MerchManager
+        merch_manager = MerchManager()
+
+    async def work(progress):
+        # generate_batch sleeps between Gemini calls, so it gets its own pool
+        filename = await run_blocking("merch", merch_manager.generate_batch, request.niche, progress)
+        return {"status": "success", "filename": filename}
+
+    return queue_job("merch-batch", work, total=0)
+
+def queue_job(kind, work, total=1):
+    """202 with the new job, or 503 while JOB_MAX_QUEUED jobs are already waiting"""
+    try:
+        job = job_manager.submit(kind, work, total=total)
+    except JobQueueFull as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503, headers={"Retry-After": "30"})
+    return JSONResponse(content=job, status_code=202)
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Job summaries, newest first (fetch /jobs/{id} for the full result)"""
+    if job_manager is None:
+        return unavailable("Job queue")
+    jobs = job_manager.list(status=status, limit=limit)
+    return {"jobs": [{k: v for k, v in job.items() if k != "result"} for job in jobs]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    if job_manager is None:
+        return unavailable("Job queue")
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return job
+
+async def read_upload(upload, limit: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Reads an uploaded file, raising PipelineError if it is larger than `limit` bytes"""
+    if upload.size is not None and upload.size > limit:
+        raise PipelineError(f"{upload.filename} is too large ({upload.size} bytes, max {limit})")
+    data = await upload.read()
+    if len(data) > limit:
+        raise PipelineError(f"{upload.filename} is too large ({len(data)} bytes, max {limit})")
+    return data
+
+async def read_batch_form(request: Request):
+    """Parses a batch form into ([(name, bytes)], concurrency).
+
+    Starlette caps a form at 1000 files; only the batch endpoints raise that, to a
+    full batch plus the archive, so the rest of the app keeps the default.
+    """
+    form = await request.form(max_files=MAX_BATCH_ITEMS + 1, max_fields=BATCH_MAX_FIELDS)
+    try:
+        files = [f for f in form.getlist("files") if not isinstance(f, str)]
+        archive = form.get("archive")
+        items = await read_batch_items(files, None if isinstance(archive, str) else archive)
+        try:
+            concurrency = int(form.get("concurrency") or DEFAULT_BATCH_CONCURRENCY)
+        except ValueError:
+            raise PipelineError(f"Invalid concurrency: {form.get('concurrency')!r}")
+        return items, concurrency
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await form.close()
+
+async def read_batch_items(files, archive):
+    """Collects [(name, bytes)] from uploaded files and an optional zip archive"""
+    items = []
+    for upload in files or []:
+        items.append((upload.filename, await read_upload(upload)))
+    if archive is not None:
+        # Files and archive share the batch limit
+        archive_bytes = await read_upload(archive, MAX_ZIP_TOTAL_BYTES)
+        items.extend(extract_zip_images(archive_bytes, MAX_BATCH_ITEMS - len(items)))
+    return items
+
+def notify_n8n(data):
+    n8n_url = os.getenv("N8N_WEBHOOK_URL")
+    if n8n_url:
+        asyncio.create_task(trigger_webhook(n8n_url, data))
 
 async def trigger_webhook(url, data):
     """Fire-and-forget webhook to n8n"""
     try:
-        async with httpx.AsyncClient() as client:
-            await client.post(url, json=data, timeout=5.0)
-            print(f"🚀 Webhook sent to n8n")
+        with timed_stage("webhook"):
+            async with httpx.AsyncClient() as client:
+                await client.post(url, json=data, timeout=5.0)
+                print(f"🚀 Webhook sent to n8n")
     except Exception as e:
         print(f"⚠️ Webhook failed: {e}")
+        ERRORS.inc("webhook")
 
 if __name__ == "__main__":
     import uvicorn
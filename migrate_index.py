@@ -0,0 +1,60 @@
+import argparse
+import itertools
+from agents.memory_agent import MemoryAgent
+from agents.pinecone_client import open_index
+from agents.index_migration import iterate_records, migrate_corpus, compare_indexes
+
+# Style x product queries like the ones the pipeline sends (see build_search_query)
+SAMPLE_STYLES = ["streetwear", "minimalist", "vintage", "y2k", "gorpcore", "coquette", "old money", "athleisure"]
+SAMPLE_TYPES = ["t-shirt", "hoodie", "jacket", "leggings", "sweater", "dress"]
+
+
+def load_queries(path, agent, limit):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()][:limit]
+    queries = [f"{style} {kind}" for style, kind in itertools.product(SAMPLE_STYLES, SAMPLE_TYPES)]
+    # Corpus texts as queries too: each should find itself in both indexes
+    for page in iterate_records(agent.index):
+        queries.extend(m["text"] for _, m in page if m.get("text"))
+        if len(queries) >= limit:
+            break
+    return queries[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed the trend index at a lower dimension and compare recall/latency")
+    parser.add_argument("--target", default="stylesync-index-v3", help="Name of the new Pinecone index")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding output dimensionality for the new index")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--skip-copy", action="store_true", help="Only evaluate an already migrated index")
+    parser.add_argument("--queries", help="File with one evaluation query per line")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    agent = MemoryAgent()
+    if agent.pc is None or agent.index is None:
+        print("❌ Migration needs the Pinecone source index. Check PINECONE_API_KEY.")
+        return
+
+    print(f"🚚 Migrating {agent.index_name} ({agent.dimension} dims) -> {args.target} ({args.dimension} dims)")
+    if args.skip_copy:
+        target = open_index(agent.pc, args.target)
+    else:
+        target = agent.ensure_index(args.target, args.dimension)
+        copied = migrate_corpus(agent, target, args.dimension, args.batch_size)
+        print(f"✅ Re-embedded {copied} records")
+
+    queries = load_queries(args.queries, agent, args.num_queries)
+    print(f"\n📏 Comparing top-{args.top_k} results on {len(queries)} queries...")
+    report = compare_indexes(agent, target, args.dimension, queries, args.top_k)
+    print(f"   overlap@{args.top_k}: {report['mean_overlap']:.3f}")
+    print(f"   {agent.index_name}: p50 {report['primary_p50_ms']} ms, p95 {report['primary_p95_ms']} ms")
+    print(f"   {args.target}: p50 {report['shadow_p50_ms']} ms, p95 {report['shadow_p95_ms']} ms")
+    print(f"\nTo dual-read in production: MEMORY_SHADOW_INDEX={args.target} MEMORY_SHADOW_DIMENSION={args.dimension}")
+    print(f"To cut over: MEMORY_INDEX_NAME={args.target} EMBEDDING_DIMENSION={args.dimension}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# Result caches stay in memory, so tests never read or write the repo's cache/ directory
+os.environ["CACHE_DIR"] = ""
@@ -0,0 +1,80 @@
+import time
+import asyncio
+import pytest
+from agents.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+RECOVERY = 0.05
+
+
+class ProviderDown(Exception):
+    pass
+
+
+def fail():
+    raise ProviderDown()
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ProviderDown):
+            breaker.call(fail)
+
+
+def test_opens_after_consecutive_failures_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_seconds=RECOVERY)
+    with pytest.raises(ProviderDown):
+        breaker.call(fail)
+    assert breaker.call(lambda: "ok") == "ok" # A success resets the count
+    trip(breaker)
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 1)
+    assert calls == []
+    stats = breaker.stats()
+    assert stats["opened"] == 1 and stats["rejected"] == 1 and stats["state_value"] == 2
+
+
+def test_half_open_lets_one_trial_through_and_success_closes():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=RECOVERY)
+    trip(breaker)
+    time.sleep(RECOVERY)
+    assert breaker.state == HALF_OPEN
+
+    breaker.before_call() # The trial is in flight...
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call() # ...so a concurrent call is rejected
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.call(lambda: 1) == 1
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=RECOVERY)
+    trip(breaker)
+    time.sleep(RECOVERY)
+    with pytest.raises(ProviderDown):
+        breaker.call(fail) # One failure is enough in half-open state
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_cancelled_trial_releases_the_slot_without_counting_a_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=RECOVERY)
+    trip(breaker)
+    time.sleep(RECOVERY)
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(breaker.call_async(cancelled))
+    assert breaker.state == HALF_OPEN
+    assert breaker.stats()["failures"] == 1
+
+    async def ok():
+        return "ok"
+
+    assert asyncio.run(breaker.call_async(ok)) == "ok"
+    assert breaker.state == CLOSED
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+import pytest
+from agents.embedding_store import EmbeddingStore, quantize
+
+DIMENSION = 64
+
+
+def unit_rows(count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def write(path, vectors, dtype="float32", keep_versions=2):
+    ids = [f"v{i}" for i in range(len(vectors))]
+    return EmbeddingStore.write(str(path), ids, vectors, [{"i": i} for i in range(len(vectors))],
+                                dtype=dtype, keep_versions=keep_versions)
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 1e-7), ("float16", 1e-3), ("int8", None)])
+def test_quantization_round_trip(dtype, tolerance):
+    vectors = unit_rows(100)
+    codes, scales = quantize(vectors, dtype)
+    restored = codes.astype(np.float32) * scales[:, None]
+    # int8 rounds to the nearest step of each vector's scale
+    limit = scales[:, None] / 2 + 1e-7 if tolerance is None else tolerance
+    assert np.all(np.abs(restored - vectors) <= limit)
+
+
+def test_int8_zero_vector_keeps_a_usable_scale():
+    codes, scales = quantize(np.zeros((1, DIMENSION), dtype=np.float32), "int8")
+    assert scales[0] == 1.0 and not codes.any()
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+@pytest.mark.parametrize("dense_cache_bytes", [0, 1 << 30])
+def test_search_finds_each_vector_first(tmp_path, dtype, dense_cache_bytes):
+    vectors = unit_rows(300)
+    store = write(tmp_path / "store", vectors * 3.0, dtype) # Norms are restored on write
+    store.dense_cache_bytes = dense_cache_bytes
+    for row in (0, 150, 299):
+        rows, scores = store.search(vectors[row], top_k=3)
+        assert rows[0] == row
+        assert scores[0] == pytest.approx(1.0, abs=1e-2)
+        assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_search_skips_excluded_rows(tmp_path):
+    vectors = unit_rows(50)
+    store = write(tmp_path / "store", vectors)
+    rows, _ = store.search(vectors[7], top_k=5, exclude_rows={7})
+    assert 7 not in rows and len(rows) == 5
+
+
+def test_new_version_swaps_current_and_old_mapping_stays_readable(tmp_path):
+    path = tmp_path / "store"
+    first = write(path, unit_rows(20, seed=1))
+    second = write(path, unit_rows(30, seed=2))
+
+    reopened = EmbeddingStore.open(str(path))
+    assert reopened.version_dir == second.version_dir and reopened.count == 30
+    with open(path / "CURRENT", encoding="utf-8") as f:
+        assert os.path.join(str(path), f.read().strip()) == second.version_dir
+    # A worker still holding the first version keeps serving it
+    assert os.path.isdir(first.version_dir)
+    assert first.search(unit_rows(20, seed=1)[3], top_k=1)[0][0] == 3
+
+    write(path, unit_rows(10, seed=3)) # keep_versions=2: the oldest version is removed
+    assert not os.path.exists(first.version_dir)
+    assert os.path.isdir(second.version_dir)
+    assert not [name for name in os.listdir(path) if name.endswith(".tmp")]
+
+
+def test_empty_store_round_trip(tmp_path):
+    store = write(tmp_path / "store", np.zeros((0, DIMENSION), dtype=np.float32))
+    assert store.count == 0
+    rows, scores = store.search(unit_rows(1)[0], top_k=5)
+    assert len(rows) == 0 and len(scores) == 0
@@ -0,0 +1,96 @@
+import asyncio
+from agents.ingestion import ingest_records
+from agents.manifest import IndexManifest
+
+
+class FakeMemory:
+    """The MemoryAgent surface ingestion uses, backed by a dict"""
+
+    def __init__(self, scope="fake|pinecone:test"):
+        self.scope = scope
+        self.records = {}
+        self.embedded = []
+        self.deleted = []
+
+    def manifest_scope(self):
+        return self.scope
+
+    def record_count(self):
+        return len(self.records)
+
+    def embedding_model(self):
+        return "fake-embedding"
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def upsert(self, vectors, save=True):
+        for vector in vectors:
+            self.records[vector["id"]] = vector
+
+    def flush(self):
+        pass
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        for vector_id in ids:
+            self.records.pop(vector_id, None)
+
+
+def trend(vector_id, text, keywords="k"):
+    return {"id": vector_id, "text": text, "keywords": keywords}
+
+
+def run(agent, records, manifest, source="feed-a", prune=False):
+    return asyncio.run(ingest_records(agent, records, source, manifest=manifest, prune=prune, chunk_size=2))
+
+
+def test_unchanged_records_are_not_embedded_again(tmp_path):
+    agent, manifest = FakeMemory(), IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    records = [trend("a", "gorpcore fleece"), trend("b", "coquette bows"), trend("c", "y2k tees")]
+    assert run(agent, records, manifest)["ingested"] == 3
+
+    agent.embedded.clear()
+    records[1] = trend("b", "coquette bows", keywords="bows, ribbons") # Keywords are part of the hash
+    result = run(agent, records, manifest)
+    assert result["ingested"] == 1 and result["unchanged"] == 2
+    assert agent.embedded == ["coquette bows"]
+
+
+def test_prune_deletes_only_records_this_source_no_longer_has(tmp_path):
+    agent, manifest = FakeMemory(), IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    run(agent, [trend("a", "one"), trend("b", "two"), trend("c", "three")], manifest, source="feed-a")
+    run(agent, [trend("x", "other feed")], manifest, source="feed-b")
+
+    result = run(agent, [trend("a", "one"), trend("c", "three")], manifest, source="feed-a", prune=True)
+    assert result["deleted"] == 1
+    assert agent.deleted == ["b"]
+    assert set(agent.records) == {"a", "c", "x"}
+    assert manifest.hashes(agent.scope, ["b"]) == {}
+
+
+def test_without_prune_nothing_is_deleted(tmp_path):
+    agent, manifest = FakeMemory(), IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    run(agent, [trend("a", "one"), trend("b", "two")], manifest)
+    assert run(agent, [trend("a", "one")], manifest)["deleted"] == 0
+    assert set(agent.records) == {"a", "b"}
+
+
+def test_manifest_of_an_emptied_index_is_forgotten(tmp_path):
+    agent, manifest = FakeMemory(), IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    records = [trend("a", "one"), trend("b", "two")]
+    run(agent, records, manifest)
+
+    agent.records.clear() # Index deleted and recreated behind the manifest's back
+    result = run(agent, records, manifest)
+    assert result["ingested"] == 2 and result["unchanged"] == 0
+    assert set(agent.records) == {"a", "b"}
+
+
+def test_scopes_do_not_share_manifest_entries(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    records = [trend("a", "one")]
+    run(FakeMemory(scope="pinecone|pinecone:v2"), records, manifest)
+    other = FakeMemory(scope="local|local:/tmp/index")
+    assert run(other, records, manifest)["ingested"] == 1
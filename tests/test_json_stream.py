@@ -0,0 +1,56 @@
+import json
+import pytest
+from agents.json_stream import JsonFieldParser, parse_json_text
+
+LISTING = {
+    "title": "Retro \"Kitsch\" Mug {limited}",
+    "description": "Line one\nline two, with [brackets] and a \\ backslash",
+    "features": ["Glossy", {"size": "12oz", "tags": ["a", "b"]}],
+    "price_estimate": 14.5,
+    "in_stock": True,
+    "discount": None
+}
+
+
+def feed_all(parser, text, chunk_size):
+    fields = []
+    for start in range(0, len(text), chunk_size):
+        fields.extend(parser.feed(text[start:start + chunk_size]))
+    return fields
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+def test_fields_complete_in_order_for_any_chunking(chunk_size):
+    text = json.dumps(LISTING, indent=2)
+    parser = JsonFieldParser()
+    assert feed_all(parser, text, chunk_size) == list(LISTING.items())
+    assert parser.done
+
+
+def test_field_is_emitted_as_soon_as_it_completes():
+    parser = JsonFieldParser()
+    assert parser.feed('{"title": "Tee", "features": ["a", ') == [("title", "Tee")]
+    assert parser.feed('"b"]') == [("features", ["a", "b"])]
+    assert parser.feed(', "price_estimate": 20') == []
+    assert parser.feed("}") == [("price_estimate", 20)]
+
+
+def test_skips_code_fence_and_ignores_trailing_text():
+    parser = JsonFieldParser()
+    fields = parser.feed('```json\n{"title": "Tee"}\n```\n{"ignored": 1}')
+    assert fields == [("title", "Tee")]
+    assert parser.done
+
+
+def test_malformed_value_is_skipped():
+    parser = JsonFieldParser()
+    assert parser.feed('{"title": tru, "description": "ok"}') == [("description", "ok")]
+
+
+def test_parse_json_text_strips_fence():
+    assert parse_json_text('```json\n{"title": "Tee"}\n```') == {"title": "Tee"}
+
+
+def test_parse_json_text_without_object_raises():
+    with pytest.raises(ValueError):
+        parse_json_text("Sorry, I cannot help with that.")
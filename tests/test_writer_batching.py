@@ -0,0 +1,120 @@
+import json
+import asyncio
+import itertools
+from types import SimpleNamespace
+from agents.circuit_breaker import CircuitBreaker
+from agents.writer_agent import WriterAgent, ListingBatcher, BATCH_SYSTEM_PROMPT
+
+_items = itertools.count()
+
+
+class FakeGroq:
+    """chat.completions.create stand-in. Batched prompts answer through `batch(ids)`,
+    which returns the completion text; single-product prompts always succeed."""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.calls = [] # Product ids per completion, in call order
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        if messages[0]["content"] == BATCH_SYSTEM_PROMPT:
+            products = json.loads(messages[1]["content"][len("PRODUCTS: "):])
+            ids = [p["id"] for p in products]
+            text = self.batch(ids)
+        else:
+            product_type = json.loads(messages[1]["content"].split("DATA:")[1].split("KEYWORDS:")[0])["product_type"]
+            ids = [product_type]
+            text = json.dumps(listing(product_type))
+        self.calls.append(ids)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+def listing(item_id):
+    return {"title": f"Listing {item_id}", "description": "d", "features": ["f"], "price_estimate": "$20-$40"}
+
+
+def make_writer(monkeypatch, batch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    writer = WriterAgent(backend="groq")
+    writer.client = FakeGroq(batch)
+    writer.breaker = CircuitBreaker("test-writer")
+    return writer
+
+
+def make_items(count):
+    # Unique inputs per test so the listing cache never answers; product_type carries the id
+    # into the single-product prompt
+    run = next(_items)
+    items = []
+    for i in range(count):
+        item_id = f"{run}-{i}"
+        items.append((item_id, {"product_type": item_id, "main_color": "Navy"}, ["streetwear"]))
+    return items
+
+
+def test_invalid_entries_are_retried_without_the_valid_ones(monkeypatch):
+    items = make_items(4)
+    poisoned = items[2][0]
+    writer = make_writer(monkeypatch, lambda ids: json.dumps({"listings": [
+        {"id": i, **(listing(i) if i != poisoned else {"title": ""})} for i in ids
+    ]}))
+
+    results = writer.write_listings(items, batch_size=4)
+
+    assert results == {item_id: listing(item_id) for item_id, _, _ in items}
+    assert writer.client.calls == [[i for i, _, _ in items], [poisoned]]
+
+
+def test_unparseable_batches_split_in_half_down_to_single_prompts(monkeypatch):
+    items = make_items(4)
+    writer = make_writer(monkeypatch, lambda ids: "not json")
+
+    results = writer.write_listings(items, batch_size=4)
+
+    ids = [i for i, _, _ in items]
+    assert results == {item_id: listing(item_id) for item_id in ids}
+    assert writer.client.calls == [ids, ids[:2], [ids[0]], [ids[1]], ids[2:], [ids[2]], [ids[3]]]
+
+
+def test_batch_size_chunks_the_items(monkeypatch):
+    items = make_items(5)
+    writer = make_writer(monkeypatch, lambda ids: json.dumps({"listings": [{"id": i, **listing(i)} for i in ids]}))
+    writer.write_listings(items, batch_size=2)
+    assert [len(ids) for ids in writer.client.calls] == [2, 2, 1]
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.batches = []
+
+    async def write_listings_async(self, items, batch_size):
+        self.batches.append([item_id for item_id, _, _ in items])
+        return {item_id: {"title": visual_data["n"]} for item_id, visual_data, _ in items}
+
+    def _fallback(self, visual_data, seo_keywords, error):
+        return {"error": str(error)}
+
+
+def test_batcher_coalesces_concurrent_writes():
+    writer = RecordingWriter()
+
+    async def main():
+        batcher = ListingBatcher(writer, size=3, linger=0.01)
+        return await asyncio.gather(*[batcher.write({"n": n}, []) for n in range(7)])
+
+    results = asyncio.run(main())
+    assert [r["title"] for r in results] == list(range(7))
+    assert [len(batch) for batch in writer.batches] == [3, 3, 1]
+
+
+def test_batcher_falls_back_when_the_batch_fails():
+    class FailingWriter(RecordingWriter):
+        async def write_listings_async(self, items, batch_size):
+            raise RuntimeError("groq down")
+
+    async def main():
+        batcher = ListingBatcher(FailingWriter(), size=2, linger=0.01)
+        return await asyncio.gather(batcher.write({"n": 1}, []), batcher.write({"n": 2}, []))
+
+    assert asyncio.run(main()) == [{"error": "groq down"}, {"error": "groq down"}]
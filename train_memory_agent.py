@@ -1,6 +1,9 @@
 import os
 import time
+import asyncio
 from agents.memory_agent import MemoryAgent
+from agents.ingestion import ingest_records
+from agents.manifest import IndexManifest
 
 def main():
     print("Initializing MemoryAgent...")
@@ -40,27 +43,11 @@ def main():
     print(f"Preparing to upload {len(samples)} samples to Pinecone...")
 
     # 2. Batch Upload
-    vectors = []
-    for item in samples:
-        # Generate embedding using the agent's internal method
-        # This ensures we use the exact same model and parameters as the agent
-        embedding = agent._get_embedding(item['text'])
-        
-        # Prepare metadata
-        # We include the 'text' in metadata so we can retrieve the full description later
-        meta = item['metadata'].copy()
-        meta['text'] = item['text'] 
-        
-        vectors.append({
-            "id": item['id'],
-            "values": embedding,
-            "metadata": meta
-        })
-
-    # Upsert to Pinecone
-    # Using the agent's underlying index object
-    agent.index.upsert(vectors=vectors)
-    print("Upload complete. vectors upserted successfully.")
+    # We include the 'text' in metadata so we can retrieve the full description later.
+    # Unchanged samples are skipped via the index manifest, so re-running makes no embedding calls.
+    records = [{"id": item['id'], "text": item['text'], **item['metadata']} for item in samples]
+    summary = asyncio.run(ingest_records(agent, records, source="train_memory_agent", manifest=IndexManifest(), prune=True))
+    print(f"Upload complete. {summary['ingested']} vectors upserted, {summary['unchanged']} unchanged.")
 
     # 3. Verify
     print("\n--- Verifying Data ---")
@@ -69,6 +56,9 @@ def main():
     
     # Generate embedding for the query
     query_embedding = agent._get_embedding(query)
+    if query_embedding is None:
+        print("❌ Embedding failed, skipping verification.")
+        return
     
     # Query the index
     results = agent.index.query(
@@ -1,5 +1,8 @@
 import time
+import asyncio
 from agents.memory_agent import MemoryAgent
+from agents.ingestion import ingest_records, IngestionError
+from agents.manifest import IndexManifest
 
 # Curated "StyleSync" Knowledge Base
 DATASET = [
@@ -35,35 +38,16 @@ def run_training():
     
     # 1. Initialize
     agent = MemoryAgent()
-    if not hasattr(agent, 'index'):
+    if not (agent.is_ready() or agent.connect()):
         print("❌ Memory Agent failed to initialize. Check API keys.")
         return
 
-    # 2. Upload Data
+    # 2. Upload Data (only new or changed concepts are embedded; removed ones are deleted)
     print(f"\n📦 Seeding {len(DATASET)} trend concepts into Pinecone...")
-    vectors = []
-    for item in DATASET:
-        embedding = agent._get_embedding(item['text'])
-        # Handle simple list return or dictionary return from newer SDK versions if needed
-        # The agent method returns list or [0.0]*768
-        
-        # Verify embedding format
-        if isinstance(embedding, dict) and 'embedding' in embedding:
-             vector_values = embedding['embedding']
-        else:
-             vector_values = embedding
-
-        if vector_values and vector_values[0] != 0.0:
-            vectors.append({
-                "id": item['id'],
-                "values": vector_values,
-                "metadata": {"keywords": item['keywords'], "text": item['text']}
-            })
-    
     try:
-        agent.index.upsert(vectors=vectors)
-        print("✅ Upload complete!")
-    except Exception as e:
+        summary = asyncio.run(ingest_records(agent, DATASET, source="train_phase3", manifest=IndexManifest(), prune=True))
+        print(f"✅ Upload complete! {summary['ingested']} embedded, {summary['unchanged']} unchanged, {summary['deleted']} deleted")
+    except IngestionError as e:
         print(f"❌ Upload failed: {e}")
         return
 
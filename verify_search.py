@@ -6,6 +6,9 @@ def check_search():
     print(f"Searching for '{query}'...")
     
     embedding = agent._get_embedding(query)
+    if embedding is None:
+        print("❌ Embedding failed.")
+        return
     results = agent.index.query(vector=embedding, top_k=5, include_metadata=True)
     
     for match in results.matches: